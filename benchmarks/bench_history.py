@@ -0,0 +1,80 @@
+"""Memory and file size of the attempt history, dict layout vs columnar.
+
+Builds --attempts synthetic attempts spread over --users users and reports,
+scaled to one million attempts: traced heap size of the old list-of-dicts
+layout and of RoleHistory columns, and the serialized size of both (JSON
+lists vs the packed binary blob, raw and base64 as stored in records). Also
+times packing and unpacking.
+
+Usage: python benchmarks/bench_history.py [--users N] [--attempts N]
+"""
+import argparse
+import base64
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_prep.history import columnize, decode_scores, encode_scores  # noqa: E402
+from synthetic import make_user  # noqa: E402
+
+
+def traced(build):
+    """Bytes still allocated by build()'s result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    per_user = args.attempts // args.users
+    total = per_user * args.users
+    print(f"building {args.users} users x {per_user} attempts...", file=sys.stderr)
+    # The JSON round trip gives every attempt its own strings, as a loaded snapshot would
+    raw = json.dumps([make_user(rng, per_user, "")['scores'] for _ in range(args.users)])
+    dicts, dict_bytes = traced(lambda: json.loads(raw))
+    columns, column_bytes = traced(lambda: [columnize(scores) for scores in dicts])
+
+    json_bytes = sum(len(json.dumps(scores)) for scores in dicts)
+    started = time.perf_counter()
+    packed = [encode_scores(scores) for scores in columns]
+    pack_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for data in packed:
+        decode_scores(data)
+    unpack_s = time.perf_counter() - started
+    packed_bytes = sum(len(data) for data in packed)
+    b64_bytes = sum(len(base64.b64encode(data)) for data in packed)
+
+    scale = 1_000_000 / total
+    mb = 1024 * 1024
+    print(f"per million attempts ({total:,} measured)")
+    print(f"{'':18} {'dicts':>10} {'columnar':>10} {'ratio':>7}")
+    print(f"{'memory (MiB)':18} {dict_bytes * scale / mb:>10.1f} {column_bytes * scale / mb:>10.1f} "
+          f"{dict_bytes / column_bytes:>6.1f}x")
+    print(f"{'file (MiB)':18} {json_bytes * scale / mb:>10.1f} {packed_bytes * scale / mb:>10.1f} "
+          f"{json_bytes / packed_bytes:>6.1f}x")
+    print(f"{'file, base64 (MiB)':18} {'':>10} {b64_bytes * scale / mb:>10.1f} "
+          f"{json_bytes / b64_bytes:>6.1f}x")
+    print(f"pack {pack_s * scale:.2f} s, unpack {unpack_s * scale:.2f} s per million attempts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Cold import time of the core package, in a fresh interpreter.
+
+Fails if importing smart_prep pulls in Streamlit, pandas or numpy, or if the
+median cold import exceeds the budget.
+
+Usage: python benchmarks/bench_import.py [--runs N] [--budget-ms MS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("streamlit", "pandas", "numpy")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import smart_prep
+elapsed = time.perf_counter() - start
+print(elapsed * 1000)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def cold_import_ms():
+    """Import smart_prep in a new interpreter; returns (ms, heavy modules loaded)"""
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    return float(out[0]), [m for m in out[1].split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    samples, heavy = [], set()
+    for _ in range(args.runs):
+        ms, loaded = cold_import_ms()
+        samples.append(ms)
+        heavy.update(loaded)
+
+    median = statistics.median(samples)
+    print(f"import smart_prep: median {median:.1f} ms, min {min(samples):.1f} ms over {args.runs} runs")
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(sorted(heavy))}")
+        return 1
+    if median > args.budget_ms:
+        print(f"FAIL: over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Leaderboard build, update and query cost at 100k+ users.
+
+Builds leaderboards for --users synthetic users, then times single-user
+updates (what update_user_score does after each answer), top-10 queries
+and own-rank lookups, and checks ranks against a full sort.
+
+Usage: python benchmarks/bench_leaderboard.py [--users N] [--updates N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_prep import Leaderboards, add_to_role_stats, new_role_stats, questions_answers  # noqa: E402
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def make_record(rng, roles, n_attempts):
+    """Just the fields the leaderboards read"""
+    record = {'role_stats': {}, 'total_questions': 0, 'correct_answers': 0}
+    for _ in range(n_attempts):
+        add_attempt(rng, record, rng.choice(roles))
+    return record
+
+
+def add_attempt(rng, record, role):
+    score = round(rng.uniform(0, 100), 2)
+    add_to_role_stats(record['role_stats'].setdefault(role, new_role_stats()), "q", score)
+    record['total_questions'] += 1
+    record['correct_answers'] += score >= 70
+
+
+class InMemoryStorage:
+    """The two storage calls Leaderboards.build makes"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def iter_usernames(self):
+        return list(self.records)
+
+    def get_user(self, username, recent=None):
+        return self.records.get(username)
+
+
+def timed_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    roles = list(questions_answers)
+    records = {f"user{i:07d}": make_record(rng, roles, rng.randint(1, 30)) for i in range(args.users)}
+
+    started = time.perf_counter()
+    leaderboards = Leaderboards.build(InMemoryStorage(records))
+    build_s = time.perf_counter() - started
+
+    usernames = list(records)
+    picks = [rng.choice(usernames) for _ in range(args.updates)]
+
+    def answer(username):
+        role = rng.choice(roles)
+        add_attempt(rng, records[username], role)
+        leaderboards.update_user(username, records[username], role)
+
+    updates = timed_calls(answer, [(u,) for u in picks])
+    tops = timed_calls(leaderboards.top, [(m, r) for m in ('average', 'accuracy', 'attempts')
+                                         for r in [None] + roles] * 50)
+    ranks = timed_calls(leaderboards.rank, [(u, 'average') for u in picks])
+
+    # Own rank must match a full sort
+    expected = sorted((u for u in usernames if records[u]['total_questions'] >= leaderboards.min_attempts),
+                      key=lambda u: (-sum(a['sum'] for a in records[u]['role_stats'].values())
+                                     / records[u]['total_questions'], u))
+    for u in picks[:200]:
+        rank, _ = leaderboards.rank(u, 'average')
+        assert rank is None or expected[rank - 1] == u, u
+
+    print(f"users:           {args.users:,}")
+    print(f"build:           {build_s:.2f} s")
+    for name, samples in (("update_user", updates), ("top 10", tops), ("rank", ranks)):
+        print(f"{name + ':':16} p50 {percentile(samples, 0.5) * 1e6:7.1f} us   "
+              f"p99 {percentile(samples, 0.99) * 1e6:7.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
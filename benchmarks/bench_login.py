@@ -0,0 +1,102 @@
+"""Login latency under a burst of concurrent logins.
+
+Simulates --sessions concurrent sessions logging in repeatedly while a probe
+thread keeps doing cheap stats reads, the way other sessions' reruns would.
+Reports login p50/p99 and throughput, and the probe's p99 while idle vs
+during the burst, which shows whether the KDF pool keeps the rest of the app
+responsive.
+
+Usage: python benchmarks/bench_login.py [--sessions N] [--logins-per-session N]
+       (INTERVIEW_PREP_KDF_WORKERS caps KDF concurrency)
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+from smart_prep import passwords  # noqa: E402
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def probe(stop, samples, interval=0.005):
+    """Stand-in for other sessions' reruns: cheap reads at a steady rate"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        sp.get_user_stats("user0")
+        samples.append(time.perf_counter() - start)
+        time.sleep(interval)
+
+
+def probe_for(seconds):
+    stop, samples = threading.Event(), []
+    thread = threading.Thread(target=probe, args=(stop, samples))
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--logins-per-session", type=int, default=4)
+    parser.add_argument("--users", type=int, default=16)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="smart_prep_login_")
+    os.chdir(workdir)
+    try:
+        for i in range(args.users):
+            sp.save_user_data(f"user{i}", "password")
+        idle = probe_for(1.0)
+
+        latencies, lock = [], threading.Lock()
+
+        def session(i):
+            for _ in range(args.logins_per_session):
+                start = time.perf_counter()
+                ok = sp.verify_user(f"user{i % args.users}", "password")
+                elapsed = time.perf_counter() - start
+                assert ok
+                with lock:
+                    latencies.append(elapsed)
+
+        stop, busy = threading.Event(), []
+        prober = threading.Thread(target=probe, args=(stop, busy))
+        prober.start()
+        started = time.perf_counter()
+        sessions = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+        for t in sessions:
+            t.start()
+        for t in sessions:
+            t.join()
+        wall = time.perf_counter() - started
+        stop.set()
+        prober.join()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"KDF workers:        {passwords.KDF_WORKERS}")
+    print(f"logins:             {len(latencies)} from {args.sessions} concurrent sessions")
+    print(f"login p50 / p99:    {percentile(latencies, 0.5) * 1e3:.0f} / {percentile(latencies, 0.99) * 1e3:.0f} ms")
+    print(f"login throughput:   {len(latencies) / wall:.1f} /s")
+    print(f"probe p99 idle:     {percentile(idle, 0.99) * 1e3:.2f} ms")
+    print(f"probe p99 in burst: {percentile(busy, 0.99) * 1e3:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
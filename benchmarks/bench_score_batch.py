@@ -0,0 +1,70 @@
+"""Throughput of score_batch against the one-at-a-time scorer.
+
+With --questions, answers are spread over a synthetic bank of that many
+questions instead of the built-in one, which is what decides the size of
+the per-question tables score_batch builds.
+
+Usage: python benchmarks/bench_score_batch.py [n_answers] [--questions N]
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+from synthetic import answer_vocabulary, make_bank  # noqa: E402
+
+
+def make_answers(bank, n, seed=0):
+    """Random answers built from the model-answer vocabulary"""
+    rng = random.Random(seed)
+    ids = [qid for role in bank.roles for qid in bank.role_ids(role)]
+    words = [w for qid in ids[:2000] for w in bank.entry(qid)['answer'].split()]
+    answers, question_ids = [], []
+    for _ in range(n):
+        answers.append(" ".join(rng.choice(words) for _ in range(rng.randint(0, 60))))
+        question_ids.append(rng.choice(ids))
+    return answers, question_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("n_answers", type=int, nargs="?", default=20000)
+    parser.add_argument("--questions", type=int, help="synthetic bank size (default: built-in bank)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.questions:
+        bank = make_bank(random.Random(args.seed), answer_vocabulary(), args.questions)
+    else:
+        bank = sp.get_question_bank()
+    n = args.n_answers
+    answers, question_ids = make_answers(bank, n, args.seed)
+    entries = {qid: bank.entry(qid) for qid in set(question_ids)}
+
+    start = time.perf_counter()
+    scalar = [sp.calculate_score(a, entries[q]['answer'], list(entries[q]['keywords']))
+              for a, q in zip(answers, question_ids)]
+    scalar_s = time.perf_counter() - start
+    scalar_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+    start = time.perf_counter()
+    batch = sp.score_batch(answers, question_ids, bank, mode="standard")
+    batch_s = time.perf_counter() - start
+    batch_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    mismatches = sum(1 for a, b in zip(scalar, batch) if a != b)
+    print(f"answers:          {n} over {len(entries)} distinct questions")
+    print(f"calculate_score:  {n / scalar_s:,.0f} answers/s  (peak RSS {scalar_rss:.0f} MB)")
+    print(f"score_batch:      {n / batch_s:,.0f} answers/s  ({scalar_s / batch_s:.1f}x, "
+          f"peak RSS {batch_rss:.0f} MB)")
+    print(f"mismatches:       {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
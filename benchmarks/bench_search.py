@@ -0,0 +1,64 @@
+"""Question search: index build time and BM25 query latency at 100k questions.
+
+Builds a synthetic bank of --questions questions (answers drawn from the
+built-in model answers' vocabulary, so term frequencies look realistic),
+indexes it, then times --queries queries of one to four terms, across all
+roles and restricted to one role.
+
+Usage: python benchmarks/bench_search.py [--questions N] [--queries N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_prep import SearchIndex, search_terms  # noqa: E402
+from synthetic import answer_vocabulary, make_bank  # noqa: E402
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = answer_vocabulary()
+    bank = make_bank(rng, words, args.questions)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.sync(bank)
+    build_s = time.perf_counter() - started
+
+    terms = sorted(set(search_terms(" ".join(words))))
+    queries = [" ".join(rng.sample(terms, rng.randint(1, 4))) for _ in range(args.queries)]
+    role = bank.roles[0]
+    results = {}
+    for name, roles in (("all roles", None), ("one role", [role])):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, 20, roles)
+            samples.append(time.perf_counter() - start)
+        results[name] = samples
+
+    print(f"questions:       {len(index):,} ({len(index.postings):,} terms)")
+    print(f"build:           {build_s:.2f} s")
+    for name, samples in results.items():
+        print(f"{'query, ' + name + ':':22} p50 {percentile(samples, 0.5) * 1e3:6.2f} ms   "
+              f"p99 {percentile(samples, 0.99) * 1e3:6.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
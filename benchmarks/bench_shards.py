@@ -0,0 +1,77 @@
+"""Concurrent write throughput of the sharded backend.
+
+Runs --writers processes that each submit --writes answers, first all for
+the same user and then spread over 1, 2, 4, ... distinct users. With one
+file and one lock per user, throughput should grow with the number of
+distinct active users; the single-user run shows the cost of contention.
+
+Usage: python benchmarks/bench_shards.py [--writers N] [--writes N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+
+
+def writer(root, username, writes):
+    storage = sp.ShardedStorage(root)
+    for i in range(writes):
+        storage.add_attempt(username, "Software Engineer", {
+            'question': "What is polymorphism?",
+            'score': float(i % 100),
+            'timestamp': f"2024-01-01T00:00:{i % 60:02d}"
+        })
+
+
+def run(root, writers, distinct, writes):
+    """Writes per second with `writers` processes spread over `distinct` users"""
+    usernames = [f"user{i % distinct}" for i in range(writers)]
+    started = time.perf_counter()
+    procs = [Process(target=writer, args=(root, u, writes)) for u in usernames]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return writers * writes / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200,
+                        help="answers submitted by each writer")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="smart_prep_shards_")
+    os.chdir(workdir)
+    try:
+        storage = sp.ShardedStorage("users")
+        for i in range(args.writers):
+            storage.add_user(f"user{i}", {'password': "x", 'email': "", 'created_at': "",
+                                          'scores': {}, 'role_stats': {},
+                                          'total_questions': 0, 'correct_answers': 0})
+        print(f"{'distinct users':>14} {'writes/s':>10}")
+        distinct, runs = 1, 0
+        while distinct <= args.writers:
+            rate = run("users", args.writers, distinct, args.writes)
+            print(f"{distinct:>14} {rate:>10,.0f}")
+            distinct, runs = distinct * 2, runs + 1
+        expected = args.writers * args.writes * runs
+        written = sum(storage.get_user(f"user{i}")['total_questions'] for i in range(args.writers))
+        assert written == expected, f"lost writes: {written} != {expected}"
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Throughput of TF-IDF scoring against the standard scorer.
+
+Scores the same random answers (see bench_score_batch) with score_question
+and with the TF-IDF model, after a warm-up pass so the model-answer
+vectors are cached, and reports the model build time and mean scores.
+
+Usage: python benchmarks/bench_tfidf.py [n_answers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+from bench_score_batch import make_answers  # noqa: E402
+
+
+def throughput(score, answers, entries):
+    start = time.perf_counter()
+    scores = [score(a, e) for a, e in zip(answers, entries)]
+    return len(answers) / (time.perf_counter() - start), sum(scores) / len(scores)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bank = sp.get_question_bank()
+    answers, question_ids = make_answers(bank, n)
+    entries = [bank.entry(q) for q in question_ids]
+
+    start = time.perf_counter()
+    model = sp.TfidfModel.from_bank(bank)
+    build_s = time.perf_counter() - start
+    for qid in set(question_ids):
+        model.score("", bank.entry(qid))
+
+    standard_rate, standard_mean = throughput(sp.score_question, answers, entries)
+    tfidf_rate, tfidf_mean = throughput(model.score, answers, entries)
+    print(f"answers:          {n}")
+    print(f"model build:      {build_s * 1000:.1f} ms ({model.n_documents} answers, {len(model.idf)} terms)")
+    print(f"score_question:   {standard_rate:,.0f} answers/s  (mean score {standard_mean:.1f})")
+    print(f"tfidf:            {tfidf_rate:,.0f} answers/s  (mean score {tfidf_mean:.1f}, "
+          f"{tfidf_rate / standard_rate:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""Load test: many concurrent simulated users driving the real Streamlit page.
+
+Each simulated user is its own AppTest session of interview_prep.py, so
+every interaction is a full script rerun, as it would be in production.
+They run concurrently in one process and share the storage backend, the
+KDF pool and the caches, the way sessions of one Streamlit server do. Each
+user signs up, logs in, picks a role, then answers --answers questions
+(choose a question, type an answer, submit), all against a fresh data
+directory.
+
+Reports per-interaction latency (p50/p95/p99), throughput, peak RSS and
+lost updates: answers the page acknowledged that a fresh instance of the
+backend, reading what's on disk, doesn't have. Interaction latency includes
+waiting for the GIL behind every other session and AppTest's own overhead;
+the app's stage timings (smart_prep.metrics) are reported alongside, so
+time spent inside the page can be told apart. Results are written as JSON
+with --output so runs with different storage or caching settings can be
+compared.
+
+Usage: python benchmarks/load_test.py [--users N] [--concurrency N]
+                                      [--answers N] [--backend json|sqlite|sharded]
+                                      [--output report.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+from smart_prep import metrics  # noqa: E402
+import streamlit  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from synthetic import answer_vocabulary, make_answer  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "interview_prep.py")
+INTERACTIONS = ("load", "signup", "login", "select_role", "select_question", "submit")
+SCORE_RE = re.compile(r"Score: (\d+(?:\.\d+)?)/100")  # render_score_feedback's banner
+
+# share_apptest_runtime() patches private Streamlit internals; these are the
+# releases it was checked against (major, minor), inclusive
+STREAMLIT_TESTED = ((1, 65), (1, 65))
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def check_streamlit(allow_untested=False):
+    """Refuse to patch a Streamlit whose internals share_apptest_runtime() doesn't know"""
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    missing = [name for owner, name in ((Runtime, "_instance"), (Runtime, "instance"), (Runtime, "exists"),
+                                         (app_test, "patch_config_options"), (app_test, "ScriptCache"),
+                                         (local_script_runner, "ScriptCache"),
+                                         (local_script_runner, "require_widgets_deltas"),
+                                         (local_script_runner.LocalScriptRunner, "script_stopped"))
+               if not hasattr(owner, name)]
+    if missing:
+        sys.exit(f"streamlit {streamlit.__version__} lacks internals this harness patches: {', '.join(missing)}")
+    version = tuple(int(part) for part in re.findall(r"\d+", streamlit.__version__)[:2])
+    if not allow_untested and not STREAMLIT_TESTED[0] <= version <= STREAMLIT_TESTED[1]:
+        low, high = (".".join(map(str, v)) for v in STREAMLIT_TESTED)
+        sys.exit(f"streamlit {streamlit.__version__} is untested (checked: {low} to {high}); "
+                 "rerun with --allow-untested-streamlit to try anyway")
+
+
+def share_apptest_runtime():
+    """Let AppTest sessions run concurrently in one process
+
+    AppTest expects one session at a time: every run installs a mock
+    Runtime singleton and a config patch, and removes both when it ends,
+    which breaks any other session still running. Keep the last runtime
+    reachable and set the config option once for the whole process instead.
+    Every run also recompiles the page, and CPython's compiler isn't safe to
+    run from several threads at once, so share one script cache. And wait
+    for each rerun by joining its script thread rather than polling every
+    millisecond, which with hundreds of sessions mostly fights over the GIL.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    pinned = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            pinned[:] = [cls._instance]
+        if not pinned:
+            raise RuntimeError("Runtime hasn't been created!")
+        return pinned[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(pinned))
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    def require_widgets_deltas(runner, timeout=3):
+        thread = runner._script_thread
+        if thread is not None:
+            thread.join(timeout)
+        if not runner.script_stopped():
+            runner.request_stop()
+            runner.join()
+            raise RuntimeError(f"AppTest script run timed out after {timeout}(s)")
+
+    local_script_runner.require_widgets_deltas = require_widgets_deltas
+
+
+class SessionFailed(Exception):
+    pass
+
+
+def widget(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise SessionFailed(f"no widget {label!r} on the page")
+
+
+class Recorder:
+    """Latency samples and error counts per interaction, shared by all sessions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in INTERACTIONS}
+        self.errors = {name: 0 for name in INTERACTIONS}
+        self.retries = 0
+        self.acknowledged = {}  # username -> answers the page showed a score for
+
+    def step(self, at, name, action):
+        """Run one interaction (a rerun) and time it; page exceptions fail the session"""
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            with self.lock:
+                self.errors[name] += 1
+            raise SessionFailed(f"{name}: {e}") from e
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if at.exception:
+                self.errors[name] += 1
+        if at.exception:
+            raise SessionFailed(f"{name}: {at.exception[0].value}")
+
+    def fail(self, name, message):
+        """The rerun went through but the page didn't show the expected outcome"""
+        with self.lock:
+            self.errors[name] += 1
+        raise SessionFailed(f"{name}: {message}")
+
+    def acknowledge(self, username):
+        with self.lock:
+            self.acknowledged[username] = self.acknowledged.get(username, 0) + 1
+
+    def retry(self):
+        with self.lock:
+            self.retries += 1
+
+
+def busy(at):
+    """The KDF pool turned the request away; a real user would try again"""
+    return any("try again" in e.value for e in at.error)
+
+
+def simulate(i, args, words, recorder, timeout):
+    """One user's whole visit; returns the username"""
+    rng = random.Random(args.seed * 100_003 + i)
+    time.sleep(args.ramp_s * i / args.users)
+    username, password = f"load{i}", f"pw-{i}"
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    recorder.step(at, "load", at.run)
+
+    def submit_form(name, fields, button):
+        for _ in range(args.max_retries + 1):
+            for label, value in fields.items():
+                widget(at.text_input, label).input(value)
+            recorder.step(at, name, widget(at.button, button).click().run)
+            if not busy(at):
+                return
+            recorder.retry()
+            time.sleep(rng.uniform(0.05, 0.25))
+        raise SessionFailed(f"{name}: KDF pool still busy after {args.max_retries} retries")
+
+    submit_form("signup", {"Choose Username": username, "Email (Optional)": f"{username}@example.com",
+                           "Create Password": password, "Confirm Password": password}, "Sign Up")
+    if not any("Account created" in s.value for s in at.success):
+        recorder.fail("signup", f"not acknowledged {[e.value for e in at.error]}")
+    submit_form("login", {"Username": username, "Password": password}, "Login")
+    if not at.session_state["logged_in"]:
+        recorder.fail("login", f"rejected {[e.value for e in at.error]}")
+
+    roles = widget(at.selectbox, "Choose a job role:")
+    role = rng.choice(roles.options)
+    recorder.step(at, "select_role", roles.select(role).run)
+
+    for _ in range(args.answers):
+        time.sleep(args.think_ms / 1000)
+        questions = widget(at.selectbox, "Choose a question to answer:")
+        recorder.step(at, "select_question", questions.select_index(rng.randrange(len(questions.options))).run)
+        widget(at.text_area, "Your Answer").input(make_answer(rng, words))
+        recorder.step(at, "submit", widget(at.button, "Submit Answer").click().run)
+        # Only an answer the page scored counts as acknowledged
+        if not any(SCORE_RE.search(m.value) for m in at.markdown):
+            recorder.fail("submit", f"no score shown {[w.value for w in [*at.warning, *at.error]]}")
+        recorder.acknowledge(username)
+    return username
+
+
+def count_lost_updates(backend, acknowledged):
+    """Compare acknowledged answers with a fresh backend instance reading from disk"""
+    sp.flush_pending_writes()
+    fresh = {'json': sp.JsonStorage, 'sqlite': sp.SqliteStorage, 'sharded': sp.ShardedStorage}[backend]()
+    lost, missing_users = 0, 0
+    for username, expected in acknowledged.items():
+        user_data = fresh.get_user(username, recent=0)
+        if user_data is None:
+            missing_users += 1
+            lost += expected
+        else:
+            lost += max(0, expected - user_data['total_questions'])
+    return lost, missing_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=200, help="sessions active at once")
+    parser.add_argument("--answers", type=int, default=3, help="answers submitted per user")
+    parser.add_argument("--backend", default="json", choices=("json", "sqlite", "sharded"))
+    parser.add_argument("--ramp-s", type=float, default=0.0, help="spread session starts over this long")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause before each question")
+    parser.add_argument("--max-retries", type=int, default=20,
+                        help="retries of a sign-up or login the KDF pool turned away")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds allowed per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report JSON here")
+    parser.add_argument("--allow-untested-streamlit", action="store_true",
+                        help="run on a Streamlit release outside STREAMLIT_TESTED")
+    args = parser.parse_args()
+    check_streamlit(args.allow_untested_streamlit)
+
+    # Read by get_default_storage on the first rerun
+    os.environ["INTERVIEW_PREP_STORAGE"] = args.backend
+    os.environ.pop("INTERVIEW_PREP_DB", None)
+    share_apptest_runtime()
+    metrics.reset()
+    words = answer_vocabulary()
+    recorder = Recorder()
+    completed, failures = [], []
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="smart_prep_load_")
+    os.chdir(workdir)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(simulate, i, args, words, recorder, args.timeout)
+                       for i in range(args.users)]
+            for i, future in enumerate(futures):
+                try:
+                    completed.append(future.result())
+                except Exception as e:  # one broken session shouldn't end the run
+                    failures.append(f"load{i}: {e}")
+        wall = time.perf_counter() - started
+        # Answers acknowledged before a session failed are checked as well
+        acknowledged = recorder.acknowledged
+        lost, missing_users = count_lost_updates(args.backend, acknowledged)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {}
+    for name in INTERACTIONS:
+        samples = recorder.samples[name]
+        results[name] = {
+            'ops': len(samples),
+            'errors': recorder.errors[name],
+            'mean_ms': sum(samples) / len(samples) * 1e3 if samples else 0.0,
+            'p50_ms': percentile(samples, 0.5) * 1e3,
+            'p95_ms': percentile(samples, 0.95) * 1e3,
+            'p99_ms': percentile(samples, 0.99) * 1e3,
+        }
+    stages = {stage: {'count': h['count'], 'mean_ms': h['sum'] / h['count'] * 1e3}
+              for stage, h in sorted(metrics.snapshot().items()) if h['count']}
+    interactions = sum(r['ops'] for r in results.values())
+    summary = {
+        'wall_s': wall,
+        'interactions_per_s': interactions / wall,
+        'answers_per_s': sum(acknowledged.values()) / wall,
+        'completed_users': len(completed),
+        'failed_users': len(failures),
+        'kdf_retries': recorder.retries,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        'acknowledged_answers': sum(acknowledged.values()),
+        'lost_updates': lost,
+        'missing_users': missing_users,
+    }
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'platform': platform.platform(),
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'answers': args.answers,
+            'backend': args.backend,
+            'think_ms': args.think_ms,
+            'seed': args.seed,
+        },
+        'results': results,
+        'app_stages': stages,
+        'summary': summary,
+        'failures': failures[:20],
+    }
+
+    print(f"{'interaction':<18}{'ops':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['ops']:>7}{r['errors']:>8}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    print(f"users:          {len(completed)} completed, {len(failures)} failed ({recorder.retries} KDF retries)")
+    print(f"throughput:     {summary['interactions_per_s']:.1f} interactions/s, "
+          f"{summary['answers_per_s']:.1f} answers/s over {wall:.1f} s")
+    if 'rerun' in stages:
+        print(f"page rerun:     {stages['rerun']['mean_ms']:.1f} ms mean inside the script "
+              f"({stages['rerun']['count']} reruns)")
+    print(f"peak RSS:       {summary['peak_rss_mb']:.0f} MB")
+    print(f"lost updates:   {lost} of {summary['acknowledged_answers']} answers, {missing_users} missing users")
+    for line in failures[:5]:
+        print(f"FAILED {line}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if lost or missing_users or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
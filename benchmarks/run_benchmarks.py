@@ -0,0 +1,170 @@
+"""Hot-path benchmarks at production-like scale.
+
+Times calculate_score, extract_keywords, get_user_stats (uncached and
+memoized), update_user_score and load_users_from_file against a synthetic
+dataset, reports throughput and p50/p99 latency, and writes the results as
+JSON. With --baseline, each path is compared against a previous results
+file and regressions beyond --threshold are flagged (exit status 1).
+
+Usage:
+  python benchmarks/run_benchmarks.py --output results.json
+  python benchmarks/run_benchmarks.py --users 100000 --attempts 10000000 \\
+      --baseline results.json
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_prep as sp  # noqa: E402
+from smart_prep import storage  # noqa: E402
+from synthetic import answer_vocabulary, make_answer, write_json_dataset, write_sqlite_dataset  # noqa: E402
+
+
+def measure(fn, args_iter):
+    """Call fn(*args) for each args tuple; latency percentiles and throughput"""
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for args in args_iter:
+        t0 = clock()
+        fn(*args)
+        samples.append(clock() - t0)
+    total_s = (clock() - started) / 1e9
+    samples.sort()
+    n = len(samples)
+    return {
+        'ops': n,
+        'ops_per_s': n / total_s if total_s else 0.0,
+        'mean_us': sum(samples) / n / 1e3,
+        'p50_us': samples[n // 2] / 1e3,
+        'p99_us': samples[min(n - 1, int(n * 0.99))] / 1e3,
+    }
+
+
+def run(args, workdir):
+    rng = random.Random(args.seed)
+    words = answer_vocabulary()
+    entries = list(sp.get_question_index()['by_id'].values())
+    answers = [make_answer(rng, words) for _ in range(args.iterations)]
+    picks = [rng.choice(entries) for _ in range(args.iterations)]
+    results = {}
+
+    results['calculate_score'] = measure(
+        sp.calculate_score,
+        ((a, e['answer'], list(e['keywords'])) for a, e in zip(answers, picks)))
+    results['extract_keywords'] = measure(sp.extract_keywords, ((a,) for a in answers))
+
+    # Storage-backed paths run against a generated dataset in workdir
+    os.chdir(workdir)
+    os.environ["INTERVIEW_PREP_STORAGE"] = args.backend
+    os.environ["INTERVIEW_PREP_DB"] = (storage.SHARDS_DIR if args.backend == "sharded"
+                                       else storage.SQLITE_FILE)
+    print(f"generating {args.users} users / {args.attempts} attempts ({args.backend})...",
+          file=sys.stderr)
+    started = time.perf_counter()
+    if args.backend in ("json", "sharded"):  # shards are migrated from the snapshot on open
+        write_json_dataset(storage.USERS_FILE, args.users, args.attempts, args.seed)
+    else:
+        write_sqlite_dataset(storage.SQLITE_FILE, args.users, args.attempts, args.seed)
+    print(f"generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.backend == "json":
+        results['load_users_from_file'] = measure(
+            sp.load_users_from_file, (() for _ in range(args.load_runs)))
+
+    sp.get_storage.cache_clear()
+    sp.get_default_storage()  # open (and for JSON, load) outside the timed region
+    usernames = [f"user{rng.randrange(args.users):07d}" for _ in range(args.iterations)]
+    # The storage path (comparable with older baselines), then memoized repeats
+    results['get_user_stats'] = measure(inspect.unwrap(sp.get_user_stats), ((u,) for u in usernames))
+    results['get_user_stats_cached'] = measure(sp.get_user_stats, ((u,) for u in usernames * 2))
+    results['update_user_score'] = measure(
+        sp.update_user_score,
+        ((u, e['role'], e['question'], rng.uniform(0, 100))
+         for u, e in zip(usernames[:args.write_iterations], picks)))
+    sp.flush_pending_writes()  # land queued events before workdir is removed
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Paths whose p50 latency or throughput regressed beyond threshold"""
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        if now['p50_us'] > before['p50_us'] * (1 + threshold):
+            regressions.append(f"{name}: p50 {before['p50_us']:.1f} -> {now['p50_us']:.1f} us")
+        if now['ops_per_s'] < before['ops_per_s'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['ops_per_s']:,.0f} -> {now['ops_per_s']:,.0f} ops/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=100000)
+    parser.add_argument("--backend", choices=("json", "sqlite", "sharded"), default="json")
+    parser.add_argument("--iterations", type=int, default=5000,
+                        help="calls per scoring/stats path")
+    parser.add_argument("--write-iterations", type=int, default=500,
+                        help="update_user_score calls")
+    parser.add_argument("--load-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="smart_prep_bench_")
+    try:
+        results = run(args, workdir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'users': args.users,
+            'attempts': args.attempts,
+            'backend': args.backend,
+            'iterations': args.iterations,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    print(f"{'path':<22}{'ops/s':>14}{'p50 us':>12}{'p99 us':>12}")
+    for name, r in results.items():
+        print(f"{name:<22}{r['ops_per_s']:>14,.0f}{r['p50_us']:>12.1f}{r['p99_us']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Synthetic users, attempts and answers for the benchmarks.
+
+Datasets are written user by user, so generating 100k users / 10M attempts
+never needs the whole database in memory.
+"""
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_prep import (MemoryQuestionBank, add_to_role_stats, add_to_rollups, hash_password,  # noqa: E402
+                        new_role_stats, new_rollups, new_schedule, questions_answers, role_descriptions,
+                        update_schedule)
+
+# Short / typical / long answers, in words
+ANSWER_LENGTHS = ((0.3, 5, 20), (0.5, 20, 80), (0.2, 80, 400))
+
+
+def answer_vocabulary():
+    return [w for qa_list in questions_answers.values() for _, a in qa_list for w in a.split()]
+
+
+def make_answer(rng, words):
+    """Random answer drawn from the model-answer vocabulary, with varied length"""
+    roll, acc = rng.random(), 0.0
+    for share, low, high in ANSWER_LENGTHS:
+        acc += share
+        if roll <= acc:
+            break
+    return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+
+def make_bank(rng, words, n):
+    """Bank of n questions spread over the built-in roles, answers drawn from `words`"""
+    roles = list(role_descriptions)
+    bank = {role: [] for role in roles}
+    for i in range(n):
+        role = roles[i % len(roles)]
+        question = " ".join(rng.choice(words) for _ in range(rng.randint(4, 10))) + f" #{i}?"
+        bank[role].append((question, " ".join(rng.choice(words) for _ in range(rng.randint(20, 80)))))
+    return MemoryQuestionBank(bank, role_descriptions)
+
+
+def make_user(rng, n_attempts, password_hash, start=datetime(2024, 1, 1)):
+    """One user record in the storage format, aggregates included"""
+    roles = list(questions_answers)
+    record = {
+        'password': password_hash,
+        'email': "",
+        'created_at': start.isoformat(),
+        'scores': {},
+        'role_stats': {},
+        'rollups': {},
+        'schedule': {},
+        'total_questions': 0,
+        'correct_answers': 0
+    }
+    when = start
+    for _ in range(n_attempts):
+        role = rng.choice(roles)
+        question, _ = rng.choice(questions_answers[role])
+        score = round(rng.uniform(0, 100), 2)
+        when += timedelta(minutes=rng.randint(1, 600))
+        record['scores'].setdefault(role, []).append(
+            {'question': question, 'score': score, 'timestamp': when.isoformat()})
+        add_to_role_stats(record['role_stats'].setdefault(role, new_role_stats()), question, score)
+        add_to_rollups(record['rollups'].setdefault(role, new_rollups()), when.isoformat(), score)
+        update_schedule(record['schedule'].setdefault(role, new_schedule()), role, question, score,
+                        when.isoformat())
+        record['total_questions'] += 1
+        if score >= 70:
+            record['correct_answers'] += 1
+    return record
+
+
+def iter_users(n_users, n_attempts, seed=0):
+    """(username, record) pairs with n_attempts spread evenly across users"""
+    rng = random.Random(seed)
+    password_hash = hash_password("password")  # scrypt is slow; share one hash
+    per_user, extra = divmod(n_attempts, n_users)
+    for i in range(n_users):
+        yield f"user{i:07d}", make_user(rng, per_user + (1 if i < extra else 0), password_hash)
+
+
+def write_json_dataset(path, n_users, n_attempts, seed=0):
+    """Stream a users_data.json snapshot to path"""
+    with open(path, "w") as f:
+        f.write("{")
+        for i, (username, record) in enumerate(iter_users(n_users, n_attempts, seed)):
+            f.write(("," if i else "") + "\n" + json.dumps(username) + ": " + json.dumps(record))
+        f.write("\n}\n")
+
+
+def write_sqlite_dataset(path, n_users, n_attempts, seed=0, batch=10000):
+    """Bulk-load a SqliteStorage database at path"""
+    from smart_prep import SqliteStorage
+
+    storage = SqliteStorage(path)
+    conn = storage.conn
+    users, attempts = [], []
+
+    def flush():
+        with conn:
+            conn.executemany(
+                "INSERT INTO users (username, password, email, created_at, total_questions, "
+                "correct_answers, role_stats, rollups, schedule) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                users)
+            conn.executemany(
+                "INSERT INTO attempts (username, role, question, score, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)", attempts)
+        users.clear()
+        attempts.clear()
+
+    for username, record in iter_users(n_users, n_attempts, seed):
+        users.append((username, record['password'], record['email'], record['created_at'],
+                      record['total_questions'], record['correct_answers'],
+                      json.dumps(record['role_stats']), json.dumps(record['rollups']),
+                      json.dumps(record['schedule'])))
+        for role, items in record['scores'].items():
+            attempts.extend((username, role, item['question'], item['score'], item['timestamp'])
+                            for item in items)
+        if len(attempts) >= batch:
+            flush()
+    flush()
+    conn.close()
@@ -0,0 +1,51 @@
+"""Export user history as NDJSON, CSV or Parquet.
+
+Streams one user at a time, so memory is bounded by the largest user's
+history rather than the whole of it. The format follows the file extension
+(.ndjson/.jsonl, .csv, .parquet); Parquet needs pyarrow. The backend is
+chosen the same way as in the app (INTERVIEW_PREP_STORAGE,
+INTERVIEW_PREP_DB); the JSON backend's files are read with a streaming
+parser rather than loaded.
+
+Usage: python export_history.py OUTPUT [--role ROLE ...] [--user NAME ...]
+                                [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+                                [--answers] [--accounts PATH]
+"""
+import argparse
+import os
+import sys
+import time
+
+from smart_prep import SnapshotSource, export_accounts, export_history, get_default_storage
+from smart_prep.export import BATCH_SIZE, FORMATS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--role", action="append", dest="roles", help="repeat for several roles")
+    parser.add_argument("--user", action="append", dest="usernames", help="repeat for several users")
+    parser.add_argument("--since", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--answers", action="store_true", help="include stored answer texts")
+    parser.add_argument("--accounts", help="also write accounts (password hashes!) as NDJSON here")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per Parquet row group")
+    args = parser.parse_args(argv)
+
+    if os.environ.get("INTERVIEW_PREP_STORAGE", "json") == "json":
+        storage = SnapshotSource()  # JsonStorage would load every user first
+    else:
+        storage = get_default_storage()
+    start = time.perf_counter()
+    rows = export_history(storage, args.output, args.format, args.roles, args.since, args.until,
+                          args.usernames, args.answers, args.batch_size)
+    print(f"{rows:,} attempts -> {args.output} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    if args.accounts:
+        accounts = export_accounts(storage, args.accounts, args.usernames)
+        print(f"{accounts:,} accounts -> {args.accounts}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Import user history written by export_history.py (restore or seed).
+
+Accounts are created first (from --accounts, if given), then attempts are
+appended per user and role in batched inserts. Users with attempts but no
+account row get a locked account that no password opens. Importing into a
+backend that already holds the same attempts duplicates them.
+
+The backend is chosen the same way as in the app (INTERVIEW_PREP_STORAGE,
+INTERVIEW_PREP_DB).
+
+Usage: python import_history.py INPUT [--accounts PATH] [--batch-size N]
+"""
+import argparse
+import sys
+import time
+
+from smart_prep import get_default_storage, import_accounts, import_history, read_rows
+from smart_prep.export import BATCH_SIZE, FORMATS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--accounts", help="NDJSON accounts file from export_history.py --accounts")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="attempts per insert")
+    args = parser.parse_args(argv)
+
+    storage = get_default_storage()
+    start = time.perf_counter()
+    if args.accounts:
+        accounts = import_accounts(storage, read_rows(args.accounts, 'ndjson'))
+        print(f"{accounts:,} accounts created", file=sys.stderr)
+    rows = import_history(storage, read_rows(args.input, args.format, args.batch_size), args.batch_size)
+    print(f"{rows:,} attempts imported in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Migrate a legacy users_data.json into another storage backend.
+
+The snapshot is parsed as a stream, one user at a time, so memory stays
+flat however large the file is; attempts are written in batched inserts.
+Finished users are recorded in a checkpoint file, so an interrupted run
+resumes where it stopped (a user cut off halfway is completed, not
+duplicated). Events still in users_events.jsonl next to the snapshot are
+applied too. Afterwards a verification pass re-reads the source and
+compares each user's total_questions, correct_answers and per-role
+attempt counts and averages with the target, and flags users the target
+holds that the source doesn't.
+
+Usage: python migrate_users.py --to {sqlite,sharded,json} [--db PATH]
+                               [--source users_data.json] [--batch-size N]
+                               [--checkpoint PATH] [--restart]
+                               [--verify-only | --no-verify]
+"""
+import argparse
+import os
+import sys
+import time
+
+from smart_prep import get_storage
+from smart_prep.migrate import BATCH_SIZE, migrate_legacy_users, verify_migration
+from smart_prep.storage import SHARDS_DIR, USERS_FILE, ShardedStorage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", required=True, choices=("sqlite", "sharded", "json"), dest="backend")
+    parser.add_argument("--db", help="SQLite file or shard directory (default: the backend's own)")
+    parser.add_argument("--source", default=USERS_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="attempts per insert")
+    parser.add_argument("--checkpoint", default="migrate.checkpoint")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and start over")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--verify-only", action="store_true")
+    group.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.backend == "json" and os.path.abspath(args.source) == os.path.abspath(USERS_FILE):
+        parser.error(f"the json backend would write to {args.source} itself; run from another directory")
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} not found")
+
+    if args.backend == "sharded":
+        # Not get_storage: it would also import a users_data.json in this directory
+        target = ShardedStorage(args.db or SHARDS_DIR, migrate=False)
+    else:
+        target = get_storage(args.backend, args.db)
+    if not args.verify_only:
+        if args.restart and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        start = time.perf_counter()
+
+        def progress(users):
+            rate = users / max(time.perf_counter() - start, 1e-9)
+            print(f"\r{users:,} users migrated ({rate:,.0f}/s)", end="", file=sys.stderr, flush=True)
+
+        migrated = migrate_legacy_users(target, args.source, batch_size=args.batch_size,
+                                        checkpoint=args.checkpoint, progress=progress)
+        print(file=sys.stderr)
+        os.remove(args.checkpoint)  # complete; the next run starts fresh
+        if args.backend == "sharded":
+            target.mark_migrated(args.source, migrated)
+
+    if args.no_verify:
+        return 0
+    mismatches = verify_migration(target, args.source)
+    for username, what, source, found in mismatches[:50]:
+        print(f"{username}: {what}: source {source}, target {found}", file=sys.stderr)
+    if mismatches:
+        print(f"verification failed: {len(mismatches):,} differences", file=sys.stderr)
+        return 1
+    print("verification passed", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Re-score stored answers with the current scoring weights.
+
+Streams users through a process pool, writes the new scores (and rebuilt
+per-role aggregates) back through the storage backend, and records each
+finished user in a checkpoint file so an interrupted run resumes where it
+stopped. Attempts saved before answer texts were kept are left unchanged.
+
+The backend and question bank are chosen the same way as in the app
+(INTERVIEW_PREP_STORAGE, INTERVIEW_PREP_DB, INTERVIEW_PREP_QUESTIONS).
+
+Usage: python rescore_history.py [--workers N] [--batch-users N]
+                                 [--checkpoint PATH] [--restart]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from smart_prep import (check_scoring_mode, flush_pending_writes, get_default_storage, get_question_bank,
+                        score_batch)
+
+
+def rescore_jobs(jobs):
+    """Worker: score [(question_id, answer_text), ...] in one batch"""
+    return score_batch([text for _, text in jobs], [qid for qid, _ in jobs])
+
+
+def plan_user(storage, bank, username):
+    """Current scores for one user plus the jobs that can be re-scored"""
+    user_data = storage.get_user(username)
+    if user_data is None:
+        return None, [], []
+    scores, jobs, slots = {}, [], []
+    for role, attempts in user_data['scores'].items():
+        scores[role] = [item['score'] for item in attempts]
+        for i, item in enumerate(attempts):
+            qid = bank.find(role, item['question'])
+            key = item.get('answer_hash')
+            if qid is None or key is None:
+                continue
+            text = storage.get_answer(key)
+            if text is not None:
+                jobs.append((qid, text))
+                slots.append((role, i))
+    return scores, jobs, slots
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r") as f:
+        return {line.rstrip("\n") for line in f if line.endswith("\n")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-users", type=int, default=200,
+                        help="users planned and scored per round")
+    parser.add_argument("--checkpoint", default="rescore.checkpoint")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and start over")
+    args = parser.parse_args(argv)
+    try:
+        check_scoring_mode()
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    done = load_checkpoint(args.checkpoint)
+
+    storage = get_default_storage()
+    bank = get_question_bank()
+    usernames = [u for u in storage.iter_usernames() if u not in done]
+    total = len(usernames) + len(done)
+    finished, rescored = len(done), 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, \
+            open(args.checkpoint, "a") as checkpoint:
+        remaining = iter(usernames)
+        while True:
+            batch = list(itertools.islice(remaining, args.batch_users))
+            if not batch:
+                break
+            plans = [(u, *plan_user(storage, bank, u)) for u in batch]
+            results = pool.map(rescore_jobs, [jobs for _, _, jobs, _ in plans if jobs])
+            for username, scores, jobs, slots in plans:
+                if jobs:
+                    for (role, i), score in zip(slots, next(results)):
+                        scores[role][i] = score
+                    storage.set_scores(username, scores)
+                    rescored += len(jobs)
+            # Only checkpoint users whose new scores are on disk
+            flush_pending_writes()
+            checkpoint.writelines(username + "\n" for username, *_ in plans)
+            checkpoint.flush()
+            finished += len(plans)
+
+            rate = rescored / max(time.perf_counter() - start, 1e-9)
+            print(f"\r{finished}/{total} users, {rescored} answers re-scored ({rate:,.0f}/s)",
+                  end="", file=sys.stderr, flush=True)
+
+    print(file=sys.stderr)
+    os.remove(args.checkpoint)  # complete; the next run starts fresh
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Core of the Smart Interview Prep Assistant.
+
+Storage, scoring, the question bank and user statistics, importable without
+Streamlit and without side effects. The Streamlit page (interview_prep.py)
+is a thin layer on top. Heavy optional dependencies (numpy) are only
+imported by the functions that need them.
+"""
+from .bank import (JsonlQuestionBank, MemoryQuestionBank, QuestionBank, SqliteQuestionBank,
+                   get_question_bank, get_question_index, open_question_bank, write_question_bank)
+from .batch import score_batch
+from .cache import (MemoCache, bump_static_version, bump_user_version, cache_stats, clear_cache,
+                    memoize_static, memoize_user)
+from .export import (export_accounts, export_history, import_accounts, import_history, iter_accounts,
+                     iter_attempts, read_rows)
+from .history import RoleHistory, decode_scores, encode_scores
+from .leaderboard import Leaderboards, RankIndex, get_leaderboards
+from .migrate import (JsonStream, SnapshotSource, iter_legacy_users, migrate_legacy_users,
+                      verify_migration)
+from .passwords import check_password, hash_password
+from .questions import (QA, build_question_index, compile_question, question_id, questions_answers,
+                        role_descriptions)
+from .progress import lttb, progress_chart_data
+from .scheduler import new_schedule, next_question, rebuild_schedules, update_schedule
+from .scoring import (STOPWORDS, KeywordMatcher, analyze_answer, calculate_score, extract_keywords,
+                      keyword_matcher, keyword_terms, score_question)
+from .search import SearchIndex, get_search_index, search_questions, search_terms
+from .stats import (add_to_role_stats, add_to_rollups, check_role_stats, new_role_stats,
+                    new_rollups, rebuild_role_stats, rebuild_rollups)
+from .storage import (JsonStorage, ShardedStorage, SqliteStorage, compact_users_file,
+                      flush_pending_writes, get_default_storage, get_storage,
+                      load_users_from_file, save_users_to_file)
+from .tfidf import (SCORING_MODE, TfidfModel, check_scoring_mode, get_tfidf_model, score_answer,
+                    score_tfidf)
+from .users import (get_progress_chart, get_user_stats, new_user_record, next_practice_question,
+                    save_user_data, update_user_score, verify_user)
@@ -0,0 +1,334 @@
+"""Question banks: the built-in one, or JSONL / SQLite files loaded lazily.
+
+A bank file can hold tens of thousands of questions per role. Nothing is
+read up front beyond the role list: a role's question IDs are loaded the
+first time it is selected, and a question is only parsed and compiled when
+it is shown or scored (compiled entries are kept in an LRU cache).
+
+JSONL banks are one JSON object per line, either a question
+{"role": ..., "question": ..., "answer": ...} or a role description
+{"role": ..., "description": ...}. Roles keep the order they first appear
+in. On first open a sidecar index (<file>.idx) of byte offsets and
+question IDs is written next to the file and then memory-mapped, so a
+question is found with a bisect and read with a single slice of the file.
+"""
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+
+from .cache import bump_static_version
+from .questions import compile_question, question_id, questions_answers, role_descriptions
+
+PAGE_SIZE = 20
+ENTRY_CACHE_SIZE = 4096
+INDEX_MAGIC = b"SPQ1"
+
+class QuestionBank:
+    """Roles, their question IDs in bank order, and compiled entries on demand
+
+    Subclasses implement _load_role(role) -> [question_id, ...] and
+    _read(question_id) -> (role, question, answer) or None.
+    """
+
+    def __init__(self, descriptions):
+        self.descriptions = descriptions  # {role: description}, in display order
+        self._role_ids = {}
+        self._lock = threading.Lock()
+        self._entry = functools.lru_cache(maxsize=ENTRY_CACHE_SIZE)(self._compile)
+        self._question = functools.lru_cache(maxsize=ENTRY_CACHE_SIZE)(self._read)
+
+    @property
+    def roles(self):
+        return list(self.descriptions)
+
+    def role_ids(self, role):
+        """Question IDs of one role in bank order, loaded on first use"""
+        ids = self._role_ids.get(role)
+        if ids is None:
+            with self._lock:
+                ids = self._role_ids.get(role)
+                if ids is None:
+                    ids = self._role_ids[role] = self._load_role(role) if role in self.descriptions else []
+        return ids
+
+    def _compile(self, qid):
+        found = self._question(qid)
+        if found is None:
+            raise KeyError(qid)
+        return compile_question(*found)
+
+    def entry(self, qid):
+        """Compiled entry (see compile_question); KeyError if not in the bank"""
+        return self._entry(qid)
+
+    def get(self, qid, default=None):
+        try:
+            return self._entry(qid)
+        except KeyError:
+            return default
+
+    def question(self, qid):
+        """Question text, or None if not in the bank; cheaper than entry()"""
+        found = self._question(qid)
+        return found[1] if found is not None else None
+
+    def record(self, qid):
+        """(role, question, answer) straight from the source, bypassing the caches"""
+        return self._read(qid)
+
+    def __contains__(self, qid):
+        return self._question(qid) is not None
+
+    def find(self, role, question):
+        """ID of a question if it is (still) in the bank, else None"""
+        qid = question_id(role, question)
+        found = self._question(qid)
+        return qid if found is not None and found[0] == role and found[1] == question else None
+
+    def page_count(self, role, page_size=PAGE_SIZE):
+        return max(1, -(-len(self.role_ids(role)) // page_size))
+
+    def page(self, role, page, page_size=PAGE_SIZE):
+        """Compiled entries of one 0-based page; only these are read"""
+        ids = self.role_ids(role)[page * page_size:(page + 1) * page_size]
+        return [self._entry(qid) for qid in ids]
+
+class MemoryQuestionBank(QuestionBank):
+    """A {role: [(question, answer), ...]} bank already in memory (the built-in one)"""
+
+    def __init__(self, bank, descriptions):
+        super().__init__({role: descriptions.get(role, "") for role in bank})
+        self.bank = bank
+        self._by_id = {}
+        for role, qa_list in bank.items():
+            for question, answer in qa_list:
+                self._by_id.setdefault(question_id(role, question), (role, question, answer))
+
+    def _load_role(self, role):
+        return [question_id(role, question) for question, _ in self.bank[role]]
+
+    def _read(self, qid):
+        return self._by_id.get(qid)
+
+    def add_question(self, role, question, answer, description=""):
+        """Append a question (and its role, if new); returns its ID"""
+        qid = question_id(role, question)
+        with self._lock:
+            if qid in self._by_id:
+                return qid
+            if role not in self.descriptions:
+                self.descriptions[role] = description
+                self.bank[role] = []
+            self.bank[role].append((question, answer))
+            self._by_id[qid] = (role, question, answer)
+            if role in self._role_ids:
+                self._role_ids[role].append(qid)
+        self._question.cache_clear()  # it may have cached a miss for this ID
+        bump_static_version()
+        return qid
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class JsonlQuestionBank(QuestionBank):
+    """JSONL bank read through a memory-mapped byte-offset index
+
+    Index layout after the header: per question (grouped by role, file
+    order within a role) its line offset and ID as uint64, then the IDs
+    sorted with their row numbers for lookups by ID.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        st = os.stat(path)
+        self.source = [st.st_size, st.st_mtime_ns]
+        index = self._open_index()
+        if index is None:
+            index = self._build_index()
+        header, columns = index
+        super().__init__({role: description for role, description, _, _ in header['roles']})
+        self._ranges = {role: (start, count) for role, _, start, count in header['roles']}
+        self.offsets, self.qids, self.sorted_qids, self.sorted_rows = columns
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+
+    @staticmethod
+    def _columns(buffer, start, n):
+        view = memoryview(buffer)[start:start + 32 * n].cast("Q")
+        return [view[i * n:(i + 1) * n] for i in range(4)]
+
+    def _open_index(self):
+        """Map an up-to-date sidecar index, or None if it is missing or stale"""
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if data[:4] != INDEX_MAGIC:
+            return None
+        (header_len,) = struct.unpack_from("<I", data, 4)
+        header = json.loads(data[8:8 + header_len])
+        if header['source'] != self.source or header['byteorder'] != sys.byteorder:
+            return None
+        return header, self._columns(data, header['start'], header['n'])
+
+    def _build_index(self):
+        """One pass over the file; the index is saved for the next process"""
+        roles, descriptions, seen = {}, {}, set()
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    role = item['role']
+                    rows = roles.setdefault(role, [])
+                    if 'question' in item:
+                        qid = int(question_id(role, item['question']), 16)
+                        if qid not in seen:
+                            seen.add(qid)
+                            rows.append((offset, qid))
+                    elif 'description' in item:
+                        descriptions[role] = item['description']
+                offset += len(line)
+
+        header_roles, offsets, qids = [], array('Q'), array('Q')
+        for role, rows in roles.items():
+            header_roles.append([role, descriptions.get(role, ""), len(offsets), len(rows)])
+            offsets.extend(row[0] for row in rows)
+            qids.extend(row[1] for row in rows)
+        order = sorted(range(len(qids)), key=qids.__getitem__)
+        n = len(qids)
+        header = {'source': self.source, 'byteorder': sys.byteorder, 'n': n, 'roles': header_roles}
+        header_bytes = json.dumps(header).encode()
+        start = -(-(8 + len(header_bytes) + 32) // 8) * 8  # 8-byte aligned columns
+        header['start'] = start
+        header_bytes = json.dumps(header).encode().ljust(start - 8)
+        data = b"".join([INDEX_MAGIC, struct.pack("<I", len(header_bytes)), header_bytes,
+                         offsets.tobytes(), qids.tobytes(),
+                         array('Q', (qids[i] for i in order)).tobytes(), array('Q', order).tobytes()])
+        try:
+            _write_atomic(self.path + ".idx", data)
+        except OSError:
+            pass  # read-only location: keep this process's copy in memory
+        return header, self._columns(data, start, n)
+
+    def _load_role(self, role):
+        start, count = self._ranges[role]
+        return [format(qid, "012x") for qid in self.qids[start:start + count]]
+
+    def _read(self, qid):
+        try:
+            key = int(qid, 16)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self.sorted_qids, key)
+        if i == len(self.sorted_qids) or self.sorted_qids[i] != key:
+            return None
+        offset = self.offsets[self.sorted_rows[i]]
+        end = self.data.find(b"\n", offset)
+        item = json.loads(self.data[offset:end if end >= 0 else len(self.data)])
+        return item['role'], item['question'], item['answer']
+
+class SqliteQuestionBank(QuestionBank):
+    """SQLite bank: a roles table and a questions table keyed by question ID"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS roles (
+        role TEXT PRIMARY KEY,
+        description TEXT NOT NULL DEFAULT '',
+        position INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS questions (
+        id TEXT PRIMARY KEY,
+        role TEXT NOT NULL REFERENCES roles(role),
+        position INTEGER NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS questions_role_position ON questions(role, position);
+    """
+
+    def __init__(self, path):
+        import sqlite3  # only paid for when this kind of bank is configured
+
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.query_lock = threading.Lock()
+        with self.query_lock:
+            rows = self.conn.execute("SELECT role, description FROM roles ORDER BY position").fetchall()
+        super().__init__(dict(rows))
+
+    def _load_role(self, role):
+        with self.query_lock:
+            return [qid for (qid,) in self.conn.execute(
+                "SELECT id FROM questions WHERE role = ? ORDER BY position", (role,))]
+
+    def _read(self, qid):
+        with self.query_lock:
+            return self.conn.execute(
+                "SELECT role, question, answer FROM questions WHERE id = ?", (qid,)).fetchone()
+
+def write_question_bank(path, bank, descriptions):
+    """Write a {role: [(question, answer), ...]} bank as JSONL, or as SQLite
+    unless the path ends in .jsonl"""
+    if path.endswith(".jsonl"):
+        with open(path, "w", encoding="utf-8") as f:
+            for role, qa_list in bank.items():
+                f.write(json.dumps({'role': role, 'description': descriptions.get(role, "")}) + "\n")
+                for question, answer in qa_list:
+                    f.write(json.dumps({'role': role, 'question': question, 'answer': answer}) + "\n")
+        return
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript(SqliteQuestionBank.SCHEMA)
+        conn.executemany("INSERT OR REPLACE INTO roles VALUES (?, ?, ?)",
+                         [(role, descriptions.get(role, ""), i) for i, role in enumerate(bank)])
+        conn.executemany("INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?, ?)",
+                         ((question_id(role, q), role, i, q, a)
+                          for role, qa_list in bank.items() for i, (q, a) in enumerate(qa_list)))
+    conn.close()
+
+def open_question_bank(path):
+    """JSONL or SQLite bank, by file extension"""
+    if path.endswith(".jsonl"):
+        return JsonlQuestionBank(path)
+    return SqliteQuestionBank(path)
+
+@functools.lru_cache(maxsize=None)
+def get_question_bank():
+    """The bank set by INTERVIEW_PREP_QUESTIONS (a .jsonl or SQLite file), else the built-in one"""
+    path = os.environ.get("INTERVIEW_PREP_QUESTIONS")
+    if path:
+        return open_question_bank(path)
+    return MemoryQuestionBank(questions_answers, role_descriptions)
+
+@functools.lru_cache(maxsize=None)
+def get_question_index():
+    """Every question of the configured bank compiled into keyed lookups
+
+    Reads the whole bank; fine for the built-in one and for tools, but the
+    app goes through get_question_bank() so large banks stay lazy.
+    """
+    bank = get_question_bank()
+    index = {'by_id': {}, 'by_role': {}, 'by_question': {}}
+    for role in bank.roles:
+        ids = index['by_role'][role] = list(bank.role_ids(role))
+        for qid in ids:
+            entry = index['by_id'][qid] = bank.entry(qid)
+            index['by_question'][(role, entry['question'])] = qid
+    return index
@@ -0,0 +1,145 @@
+"""Vectorized scoring of many answers at once."""
+import itertools
+
+from .bank import get_question_bank
+from .scoring import WORD_RE, score_question
+from .tfidf import check_scoring_mode, score_answer
+
+# =========================
+# Batch scoring
+# =========================
+# ASCII \w is exactly [A-Za-z0-9_], so for ASCII text a byte translate + split
+# yields the same tokens as WORD_RE at a fraction of the cost
+_ASCII_WORD_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_")
+_ASCII_NON_WORD_TO_SPACE = bytes(c if c in _ASCII_WORD_BYTES else 32 for c in range(256))
+
+def _batch_tokens(lower):
+    if lower.isascii():
+        return lower.encode().translate(_ASCII_NON_WORD_TO_SPACE).split()
+    return [t.encode() for t in WORD_RE.findall(lower)]
+
+# Distinct questions scored in one vectorized pass; larger batches are split
+BATCH_QUESTIONS = 4096
+
+def score_batch(answers, question_ids, bank=None, mode=None):
+    """Score many answers in one vectorized pass; matches score_answer exactly"""
+    bank = bank or get_question_bank()
+    mode = check_scoring_mode(mode)  # an unknown mode fails before any work
+    if mode != 'standard':  # already one sparse dot product per answer
+        return [score_answer(a, bank.entry(qid), mode) for a, qid in zip(answers, question_ids)]
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return [score_question(a, bank.entry(qid)) for a, qid in zip(answers, question_ids)]
+
+    if len(set(question_ids)) <= BATCH_QUESTIONS:
+        return _score_chunk(answers, question_ids, bank)
+    # Grouped by question, so each question is compiled and tabled once
+    order = sorted(range(len(answers)), key=question_ids.__getitem__)
+    groups = [list(group) for _, group in itertools.groupby(order, key=question_ids.__getitem__)]
+    scores = [0.0] * len(answers)
+    for k in range(0, len(groups), BATCH_QUESTIONS):
+        chunk = [i for group in groups[k:k + BATCH_QUESTIONS] for i in group]
+        chunk_scores = _score_chunk([answers[i] for i in chunk], [question_ids[i] for i in chunk], bank)
+        for i, score in zip(chunk, chunk_scores):
+            scores[i] = score
+    return scores
+
+def _score_chunk(answers, question_ids, bank):
+    import numpy as np
+
+    n = len(answers)
+    if n == 0:
+        return []
+
+    # Per-question tables: one row per distinct question in the batch
+    qids = list(dict.fromkeys(question_ids))
+    q_row = {qid: i for i, qid in enumerate(qids)}
+    entries = [bank.entry(qid) for qid in qids]
+    answer_q = np.fromiter((q_row[qid] for qid in question_ids), dtype=np.int64, count=n)
+
+    # Vocabulary over model-answer tokens (as bytes, see _batch_tokens);
+    # user tokens outside it can never overlap
+    vocab = {}
+    model_rows, model_cols = [], []
+    for i, entry in enumerate(entries):
+        for token in entry['answer_tokens']:
+            model_rows.append(i)
+            model_cols.append(vocab.setdefault(token.encode(), len(vocab)))
+    # Single-word keywords are looked up in the same vocabulary (unless stemmed)
+    matchers = [entry['matcher'] for entry in entries]
+    stemmed = any(matcher.stem for matcher in matchers)
+    keyword_rows, keyword_cols, keyword_counts = [], [], []
+    anchor_rows, anchor_cols = [], []
+    if not stemmed:
+        for i, matcher in enumerate(matchers):
+            for token, keywords in matcher.single.items():
+                keyword_rows.append(i)
+                keyword_cols.append(vocab.setdefault(token.encode(), len(vocab)))
+                keyword_counts.append(len(keywords))
+            for token in matcher.anchors:
+                anchor_rows.append(i)
+                anchor_cols.append(vocab.setdefault(token.encode(), len(vocab)))
+    vocab_size = max(len(vocab), 1)
+
+    # The question x vocabulary tables are kept sparse: one sorted array of
+    # question * vocab_size + token keys, with what each pair is (model
+    # answer token, keyword weight, anchor) alongside; each (question, token)
+    # pair of the answers is looked up with a binary search
+    rows = np.array(model_rows + keyword_rows + anchor_rows, dtype=np.int64)
+    cols = np.array(model_cols + keyword_cols + anchor_cols, dtype=np.int64)
+    table, inverse = np.unique(rows * vocab_size + cols, return_inverse=True)
+    table = np.append(table, np.iinfo(np.int64).max)  # sentinel: every search lands in range
+    n_model, n_keyword = len(model_rows), len(keyword_rows)
+    is_model = np.zeros(len(table), dtype=bool)
+    is_model[inverse[:n_model]] = True
+    keyword_weights = np.zeros(len(table), dtype=np.int64)
+    keyword_weights[inverse[n_model:n_model + n_keyword]] = keyword_counts
+    is_anchor = np.zeros(len(table), dtype=bool)
+    is_anchor[inverse[n_model + n_keyword:]] = True
+
+    # Sparse answer x vocabulary matrix in COO form, deduplicated like a set
+    lowers = [a.lower() for a in answers]
+    tokens, token_counts = [], []
+    for lower in lowers:
+        found = _batch_tokens(lower)
+        tokens.extend(found)
+        token_counts.append(len(found))
+    cols = np.fromiter(map(vocab.get, tokens, itertools.repeat(-1)), dtype=np.int64, count=len(tokens))
+    rows = np.repeat(np.arange(n, dtype=np.int64), token_counts)
+    in_vocab = cols >= 0
+    cells = np.sort(rows[in_vocab] * vocab_size + cols[in_vocab])
+    cells = cells[np.concatenate(([True], cells[1:] != cells[:-1]))]
+    rows, cols = cells // vocab_size, cells % vocab_size
+    cell_keys = answer_q[rows] * vocab_size + cols
+    pos = np.searchsorted(table, cell_keys)
+    found = table[pos] == cell_keys
+    rows, pos = rows[found], pos[found]
+    common = np.bincount(rows[is_model[pos]], minlength=n)
+
+    # Whole-word keyword hits, as KeywordMatcher.match counts them: single
+    # words from the lookup, longer keywords by running the automaton
+    n_keywords = np.array([len(entry['keywords']) for entry in entries], dtype=np.int64)[answer_q]
+    if stemmed:
+        keyword_matches = np.fromiter(
+            (len(matchers[q].match(lower)) for q, lower in zip(answer_q.tolist(), lowers)),
+            dtype=np.int64, count=n)
+    else:
+        keyword_matches = np.bincount(rows, weights=keyword_weights[pos], minlength=n).astype(np.int64)
+        # The automaton only runs where match() would run it
+        has_anchor = np.bincount(rows[is_anchor[pos]], minlength=n) > 0
+        always = np.array([matcher.always_scan for matcher in matchers], dtype=bool)[answer_q]
+        for i in np.flatnonzero(has_anchor | always).tolist():
+            keyword_matches[i] += len(matchers[answer_q[i]].scan(lowers[i]))
+
+    model_lengths = np.array([entry['answer_length'] for entry in entries], dtype=np.int64)[answer_q]
+    model_sizes = np.array([len(entry['answer_tokens']) for entry in entries], dtype=np.int64)[answer_q]
+    user_lengths = np.fromiter((len(a) for a in answers), dtype=np.int64, count=n)
+
+    # Same arithmetic, in the same order, as _score_parts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keyword_score = np.where(n_keywords > 0, (keyword_matches / n_keywords) * 40, 0.0)
+        length_score = np.minimum(user_lengths / np.maximum(model_lengths, 1), 1.0) * 20
+        overlap_score = np.where(model_sizes > 0, (common / model_sizes) * 40, 0.0)
+    total = keyword_score + length_score + overlap_score
+    return np.minimum(total, 100).tolist()
@@ -0,0 +1,140 @@
+"""Memoization for page reruns, with write-triggered invalidation.
+
+Two scopes share one size-bounded LRU:
+
+    @memoize_static       # per process; for content that only changes when
+    def search(query):    # the question bank does (bump_static_version)
+        ...
+
+    @memoize_user         # first argument is a username; entries are
+    def get_user_stats(username):  # dropped when that user's data changes
+        ...
+
+Every write to a user goes through bump_user_version, which drops only
+that user's entries. User-scoped entries also expire after
+INTERVIEW_PREP_CACHE_TTL seconds to pick up writes made by other processes.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get("INTERVIEW_PREP_CACHE_SIZE", "2048"))
+USER_TTL = float(os.environ.get("INTERVIEW_PREP_CACHE_TTL", "30"))
+SCOPES = ('static', 'user')
+
+class MemoCache:
+    """LRU of key -> value, optionally tagged with the user it was derived from"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, username or None, expires or None)
+        self.by_user = {}             # username -> keys tagged with that user
+        self.versions = {}            # username -> write count
+        self.static_version = 0
+        self.counts = {(scope, result): 0 for scope in SCOPES for result in ('hit', 'miss')}
+        self.evictions = 0
+
+    def lookup(self, key, scope):
+        """(True, value) on a hit, (False, None) on a miss"""
+        with self.lock:
+            found = self.entries.get(key)
+            if found is not None and (found[2] is None or found[2] > time.monotonic()):
+                self.entries.move_to_end(key)
+                self.counts[scope, 'hit'] += 1
+                return True, found[0]
+            self.counts[scope, 'miss'] += 1
+            return False, None
+
+    def store(self, key, value, username=None, ttl=None):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, username, None if ttl is None else time.monotonic() + ttl)
+            if username is not None:
+                self.by_user.setdefault(username, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, username, _ = self.entries.pop(key)
+        if username is not None:
+            keys = self.by_user[username]
+            keys.discard(key)
+            if not keys:
+                del self.by_user[username]
+
+    def user_version(self, username):
+        return self.versions.get(username, 0)
+
+    def bump_user(self, username):
+        """A write to this user: forget everything derived from their data"""
+        with self.lock:
+            self.versions[username] = self.versions.get(username, 0) + 1
+            for key in list(self.by_user.get(username, ())):
+                self._drop(key)
+
+    def bump_static(self):
+        """The question bank changed: static entries are keyed by this version"""
+        with self.lock:
+            self.static_version += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_user.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': {scope: self.counts[scope, 'hit'] for scope in SCOPES},
+                    'misses': {scope: self.counts[scope, 'miss'] for scope in SCOPES},
+                    'evictions': self.evictions, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+_cache = MemoCache()
+
+def memoize_static(func):
+    """Cache per process, until the next bump_static_version(); arguments
+    must be positional and hashable"""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = (name, _cache.static_version, args)
+        hit, value = _cache.lookup(key, 'static')
+        if not hit:
+            value = func(*args)
+            _cache.store(key, value)
+        return value
+    return wrapper
+
+def memoize_user(func):
+    """Cache per (username, that user's version); the first argument is the username"""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(username, *args):
+        # A result computed while a write lands is stored under the old
+        # version, so it can never be served after the bump
+        key = (name, username, _cache.user_version(username), args)
+        hit, value = _cache.lookup(key, 'user')
+        if not hit:
+            value = func(username, *args)
+            _cache.store(key, value, username, USER_TTL)
+        return value
+    return wrapper
+
+def bump_user_version(username):
+    _cache.bump_user(username)
+
+def bump_static_version():
+    _cache.bump_static()
+
+def cache_stats():
+    """{'hits': {scope: n}, 'misses': {scope: n}, 'evictions': n, 'size': n, 'maxsize': n}"""
+    return _cache.stats()
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,225 @@
+"""Streaming export and import of user history.
+
+Attempts are exported one row per attempt, one user at a time, so memory
+stays bounded by the largest single user rather than the whole history
+(for the JSON backend, read it through migrate.SnapshotSource: JsonStorage
+loads every user up front):
+
+    username, role, question, score, timestamp, answer_hash[, answer]
+
+as NDJSON, CSV or Parquet (pyarrow, written in row groups). Accounts
+(password hash, email, created_at) are exported separately, as NDJSON.
+Importing streams the same files back and inserts each user's attempts
+per role in batches through the backend's add_attempts.
+"""
+import csv
+import json
+import os
+from datetime import date, datetime
+from itertools import chain, groupby, islice
+
+from .cache import bump_user_version
+from .storage import flush_pending_writes
+from .users import new_user_record
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+ATTEMPT_FIELDS = ('username', 'role', 'question', 'score', 'timestamp', 'answer_hash')
+BATCH_SIZE = 10_000
+LOCKED_PASSWORD = "!"  # matches no password: accounts created for attempts without one
+
+def detect_format(path):
+    """Format from the file extension (.ndjson/.jsonl, .csv, .parquet)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if ext in ('.csv', '.parquet'):
+        return ext[1:]
+    raise ValueError(f"Unknown export format for {path}; use .ndjson, .csv or .parquet")
+
+def _day(value):
+    """date from a date, datetime or ISO string; None passes through"""
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(value[:10])
+
+def _user_records(storage, usernames, recent=None):
+    """(username, user_data) for each user to export, one at a time"""
+    from .migrate import SnapshotSource  # migrate imports this module
+    if isinstance(storage, SnapshotSource):
+        yield from storage.iter_users(usernames)
+        return
+    if usernames is None:
+        usernames = storage.iter_usernames()
+    for username in usernames:
+        user_data = storage.get_user(username, recent=recent)
+        if user_data is not None:
+            yield username, user_data
+
+def iter_attempts(storage, roles=None, since=None, until=None, usernames=None, answers=False):
+    """Attempt rows in user, role, history order
+
+    `roles` and `usernames` restrict what's exported; `since` and `until`
+    are inclusive dates. With `answers`, rows carry the stored answer text.
+    """
+    roles = None if roles is None else set(roles)
+    since = _day(since).isoformat() if since is not None else None
+    until = _day(until).isoformat() if until is not None else None
+    for username, user_data in _user_records(storage, usernames):
+        for role, attempts in user_data['scores'].items():
+            if roles is not None and role not in roles:
+                continue
+            for attempt in attempts:
+                day = attempt['timestamp'][:10]
+                if (since is not None and day < since) or (until is not None and day > until):
+                    continue
+                row = {'username': username, 'role': role, 'question': attempt['question'],
+                       'score': attempt['score'], 'timestamp': attempt['timestamp'],
+                       'answer_hash': attempt.get('answer_hash')}
+                if answers:
+                    key = row['answer_hash']
+                    row['answer'] = storage.get_answer(key) if key is not None else None
+                yield row
+
+def iter_accounts(storage, usernames=None):
+    """Account rows (password hash, email, created_at), one per user"""
+    for username, user_data in _user_records(storage, usernames, recent=0):
+        yield {'username': username, 'password': user_data['password'],
+               'email': user_data.get('email', ''), 'created_at': user_data.get('created_at')}
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def write_ndjson(path, rows):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def write_csv(path, rows, fields=ATTEMPT_FIELDS):
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def write_parquet(path, rows, fields=ATTEMPT_FIELDS, batch_size=BATCH_SIZE):
+    """Written one row group of `batch_size` rows at a time; needs pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from None
+    types = {'score': pa.float64()}
+    schema = pa.schema([(name, types.get(name, pa.string())) for name in fields])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            columns = {name: [row.get(name) for row in batch] for name in fields}
+            writer.write_table(pa.table(columns, schema=schema))
+            count += len(batch)
+    return count
+
+def export_history(storage, path, fmt=None, roles=None, since=None, until=None, usernames=None,
+                   answers=False, batch_size=BATCH_SIZE):
+    """Write matching attempts to `path`; returns the number of rows"""
+    fmt = fmt or detect_format(path)
+    rows = iter_attempts(storage, roles, since, until, usernames, answers)
+    fields = ATTEMPT_FIELDS + ('answer',) if answers else ATTEMPT_FIELDS
+    if fmt == 'ndjson':
+        return write_ndjson(path, rows)
+    if fmt == 'csv':
+        return write_csv(path, rows, fields)
+    if fmt == 'parquet':
+        return write_parquet(path, rows, fields, batch_size)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def export_accounts(storage, path, usernames=None):
+    return write_ndjson(path, iter_accounts(storage, usernames))
+
+# ============================================================================
+# READERS AND IMPORT
+# ============================================================================
+
+def read_rows(path, fmt=None, batch_size=BATCH_SIZE):
+    """Stream rows back from an export file"""
+    fmt = fmt or detect_format(path)
+    if fmt == 'ndjson':
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'csv':
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if 'score' in row:
+                    row['score'] = float(row['score'])
+                # CSV can't tell None from "": both mean "not stored"
+                for key in ('answer_hash', 'answer'):
+                    if row.get(key) == "":
+                        row[key] = None
+                yield row
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet import needs pyarrow: pip install pyarrow") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+def import_accounts(storage, rows):
+    """Create the accounts that don't exist yet; returns how many were added"""
+    added = 0
+    for row in rows:
+        if storage.user_exists(row['username']):
+            continue
+        storage.add_user(row['username'], new_user_record(row['password'], row.get('email') or '',
+                                                          row.get('created_at')))
+        bump_user_version(row['username'])
+        added += 1
+    return added
+
+def import_history(storage, rows, batch_size=BATCH_SIZE):
+    """Append attempt rows to `storage`; returns the number imported
+
+    Rows must be grouped by user and role and in history order within a
+    role, as export_history writes them. Each run of rows is inserted
+    `batch_size` attempts at a time. Users without an account get a locked
+    one (no password matches it). Answer texts in the rows are stored again.
+    """
+    imported = 0
+    for (username, role), group in groupby(rows, key=lambda row: (row['username'], row['role'])):
+        if not storage.user_exists(username):
+            first = next(group)
+            storage.add_user(username, new_user_record(LOCKED_PASSWORD, '', first['timestamp']))
+            group = chain([first], group)
+        while True:
+            batch = [_attempt(storage, row) for row in islice(group, batch_size)]
+            if not batch:
+                break
+            storage.add_attempts(username, role, batch)
+            imported += len(batch)
+        bump_user_version(username)
+    flush_pending_writes()
+    return imported
+
+def _attempt(storage, row):
+    attempt = {'question': row['question'], 'score': row['score'], 'timestamp': row['timestamp']}
+    if row.get('answer') is not None:
+        attempt['answer_hash'] = storage.put_answer(row['answer'])
+    elif row.get('answer_hash') is not None:
+        attempt['answer_hash'] = row['answer_hash']
+    return attempt
@@ -0,0 +1,189 @@
+"""Columnar attempt history: one set of typed arrays per role.
+
+An attempt used to be a dict holding the full question text and an ISO
+timestamp, several hundred bytes each. RoleHistory keeps the same data as
+parallel arrays instead: the 48-bit question ID, epoch seconds, a float32
+score and the raw 16-byte answer hash, about 32 bytes per attempt. It still
+behaves like a list of attempt dicts (len, indexing, slicing, iteration,
+append), so code reading user_data['scores'][role] does not need to know.
+The text of each distinct question is kept once per role next to the
+columns, so a history reads back the same after the question bank changes.
+
+On disk the whole 'scores' mapping is packed into one little-endian binary
+blob (see encode_scores), stored base64-encoded under 'history'.
+"""
+import base64
+import binascii
+import functools
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+from .bank import get_question_bank
+from .questions import question_id
+
+FORMAT_MAGIC = b"SPH1"
+_EPOCH = datetime(1970, 1, 1)
+_NO_ANSWER = bytes(16)
+_SECOND = timedelta(seconds=1)
+MISSING_QUESTION = "[question {:012x}, no longer in the question bank]"
+
+@functools.lru_cache(maxsize=65536)
+def _bank_question(code):
+    """Question ID (as int) -> question text, or None if it left the bank"""
+    return get_question_bank().question(format(code, "012x"))
+
+@functools.lru_cache(maxsize=4096)
+def _question_code(role, question):
+    return int(question_id(role, question), 16)
+
+def to_epoch(timestamp):
+    """ISO timestamp (naive local time, as the app writes them) -> epoch seconds"""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - _EPOCH) // _SECOND
+
+def _to_iso(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat()
+
+class RoleHistory:
+    """One role's attempts as parallel arrays, oldest first"""
+
+    __slots__ = ('role', 'qids', 'times', 'scores', 'answers', 'names')
+
+    def __init__(self, role, attempts=()):
+        self.role = role
+        self.qids = array('Q')
+        self.times = array('I')
+        self.scores = array('f')
+        self.answers = bytearray()
+        self.names = {}  # question ID -> text, for every question in this role's history
+        if attempts:
+            self.extend(attempts)
+
+    def append(self, attempt):
+        self.extend((attempt,))
+
+    def extend(self, attempts):
+        """Append attempt dicts, one column at a time"""
+        codes = [_question_code(self.role, item['question']) for item in attempts]
+        names = self.names
+        for code, item in zip(codes, attempts):
+            if code not in names:
+                names[code] = sys.intern(item['question'])
+        self.qids.extend(codes)
+        self.times.extend([to_epoch(item['timestamp']) for item in attempts])
+        self.scores.extend([item['score'] for item in attempts])
+        self.answers += b"".join([bytes.fromhex(item['answer_hash']) if item.get('answer_hash')
+                                  else _NO_ANSWER for item in attempts])
+
+    def _attempt(self, i):
+        code = self.qids[i]
+        question = self.names.get(code)
+        if question is None:
+            # Packed before every text was kept: only questions that had left
+            # the bank were, the rest resolve through the current bank
+            question = _bank_question(code) or MISSING_QUESTION.format(code)
+        item = {'question': question, 'score': self.scores[i], 'timestamp': _to_iso(self.times[i])}
+        key = self.answers[16 * i:16 * i + 16]
+        if key != _NO_ANSWER:
+            item['answer_hash'] = key.hex()
+        return item
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._attempt(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("attempt index out of range")
+        return self._attempt(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._attempt(i)
+
+    def set_scores(self, scores):
+        """Overwrite the first len(scores) scores (used by re-scoring)"""
+        for i, score in zip(range(len(self)), scores):
+            self.scores[i] = score
+
+    def to_bytes(self):
+        role = self.role.encode()
+        names = json.dumps({str(k): v for k, v in self.names.items()}).encode() if self.names else b""
+        columns = [self.qids, self.times, self.scores]
+        if sys.byteorder == "big":
+            columns = [array(c.typecode, c) for c in columns]
+            for c in columns:
+                c.byteswap()
+        return b"".join([struct.pack("<HI", len(role), len(self)), role,
+                         *(c.tobytes() for c in columns), bytes(self.answers),
+                         struct.pack("<I", len(names)), names])
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """Decode one role; returns (history, offset just past it)"""
+        role_len, n = struct.unpack_from("<HI", data, offset)
+        offset += 6
+        history = cls(data[offset:offset + role_len].decode())
+        offset += role_len
+        for column in (history.qids, history.times, history.scores):
+            size = n * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            offset += size
+        history.answers = bytearray(data[offset:offset + 16 * n])
+        offset += 16 * n
+        (names_len,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        if names_len:
+            names = json.loads(data[offset:offset + names_len])
+            history.names = {int(k): sys.intern(v) for k, v in names.items()}
+            offset += names_len
+        return history, offset
+
+def columnize(scores):
+    """{role: [attempt dict, ...]} -> {role: RoleHistory}; already-columnar roles are kept"""
+    return {role: attempts if isinstance(attempts, RoleHistory) else RoleHistory(role, attempts)
+            for role, attempts in scores.items()}
+
+def encode_scores(scores):
+    """Pack a whole 'scores' mapping into one binary blob"""
+    parts = [FORMAT_MAGIC, struct.pack("<H", len(scores))]
+    parts.extend(attempts.to_bytes() for attempts in columnize(scores).values())
+    return b"".join(parts)
+
+def decode_scores(data):
+    if data[:4] != FORMAT_MAGIC:
+        raise ValueError("not a packed attempt history")
+    (n_roles,) = struct.unpack_from("<H", data, 4)
+    offset, scores = 6, {}
+    for _ in range(n_roles):
+        history, offset = RoleHistory.from_bytes(data, offset)
+        scores[history.role] = history
+    return scores
+
+def pack_record(user_data):
+    """User record as stored on disk: 'scores' replaced by packed 'history'"""
+    record = {k: v for k, v in user_data.items() if k != 'scores'}
+    record['history'] = base64.b64encode(encode_scores(user_data.get('scores', {}))).decode()
+    return record
+
+def unpack_record(record):
+    """Stored record (packed, or the older list-of-dicts layout) -> in-memory record"""
+    user_data = {k: v for k, v in record.items() if k != 'history'}
+    if 'history' in record:
+        try:
+            user_data['scores'] = decode_scores(base64.b64decode(record['history']))
+        except (binascii.Error, struct.error) as e:
+            raise ValueError(f"corrupt attempt history: {e}") from e
+    else:
+        user_data['scores'] = columnize(record.get('scores', {}))
+    return user_data
@@ -0,0 +1,204 @@
+"""Global and per-role leaderboards kept up to date on every answer."""
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+from .stats import rebuild_role_stats, role_stats_outdated
+
+METRICS = ('accuracy', 'average', 'attempts')
+# Accuracy and average only rank users with at least this many attempts
+MIN_ATTEMPTS = int(os.environ.get("INTERVIEW_PREP_LEADERBOARD_MIN_ATTEMPTS", "5"))
+# Rebuild from storage this often to pick up writes made by other processes
+REFRESH_SECONDS = float(os.environ.get("INTERVIEW_PREP_LEADERBOARD_REFRESH", "300"))
+
+class RankIndex:
+    """Users ordered by one metric, best first (ties broken by username)
+
+    Keys (-value, username) live in a bucketed sorted list, as in
+    sortedcontainers: finding a key is two bisects, an insert or delete only
+    shifts one bucket of at most 2 * LOAD keys, and a rank is the sizes of
+    the buckets in front plus a bisect. At 100k users that is ~100 buckets.
+    """
+
+    LOAD = 512
+
+    __slots__ = ('buckets', 'maxes', 'values')
+
+    def __init__(self):
+        self.buckets = []  # sorted lists of keys, in order
+        self.maxes = []    # last key of each bucket
+        self.values = {}
+
+    @classmethod
+    def from_values(cls, values):
+        """Bulk-load {username: value} with one sort"""
+        index = cls()
+        index.values = values
+        keys = sorted((-value, username) for username, value in values.items())
+        index.buckets = [keys[i:i + cls.LOAD] for i in range(0, len(keys), cls.LOAD)]
+        index.maxes = [bucket[-1] for bucket in index.buckets]
+        return index
+
+    def _bucket(self, key):
+        return min(bisect_left(self.maxes, key), len(self.buckets) - 1)
+
+    def _insert(self, key):
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            return
+        i = self._bucket(key)
+        bucket = self.buckets[i]
+        insort(bucket, key)
+        self.maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            self.buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self.maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+
+    def _remove(self, key):
+        i = self._bucket(key)
+        bucket = self.buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self.maxes[i] = bucket[-1]
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+
+    def set(self, username, value):
+        """Insert, move or (value None) remove one user"""
+        old = self.values.get(username)
+        if old == value:
+            return
+        if old is not None:
+            self._remove((-old, username))
+        if value is None:
+            del self.values[username]
+            return
+        self.values[username] = value
+        self._insert((-value, username))
+
+    def top(self, k):
+        result = []
+        for bucket in self.buckets:
+            result.extend((username, -neg) for neg, username in bucket[:k - len(result)])
+            if len(result) >= k:
+                break
+        return result
+
+    def rank(self, username):
+        """1-based rank, or None if the user isn't on this board"""
+        value = self.values.get(username)
+        if value is None:
+            return None
+        key = (-value, username)
+        i = self._bucket(key)
+        return sum(map(len, self.buckets[:i])) + bisect_left(self.buckets[i], key) + 1
+
+    def __len__(self):
+        return len(self.values)
+
+def user_metrics(user_data, min_attempts=MIN_ATTEMPTS, roles=None):
+    """{(metric, role or None): value or None} for one user record
+
+    Global metrics are always included; per-role ones for `roles`, or for
+    every role the user has answered.
+    """
+    role_stats = user_data.get('role_stats')
+    if role_stats is None or role_stats_outdated(role_stats):
+        role_stats = rebuild_role_stats(user_data.get('scores', {}))
+    scopes = [(None, user_data.get('total_questions', 0), user_data.get('correct_answers', 0),
+               sum(agg['sum'] for agg in role_stats.values()))]
+    scopes.extend((role, agg['count'], agg['correct'], agg['sum']) for role, agg in role_stats.items()
+                  if roles is None or role in roles)
+
+    metrics = {}
+    for role, count, correct, total in scopes:
+        ranked = count >= min_attempts
+        metrics['attempts', role] = count or None
+        metrics['accuracy', role] = correct / count * 100 if ranked else None
+        metrics['average', role] = total / count if ranked else None
+    return metrics
+
+class Leaderboards:
+    """One RankIndex per (metric, scope); scope is a role or None for global"""
+
+    def __init__(self, min_attempts=MIN_ATTEMPTS):
+        self.min_attempts = min_attempts
+        self.lock = threading.Lock()
+        self.boards = {}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, storage, min_attempts=MIN_ATTEMPTS):
+        """Full scan of storage; only done at startup and on periodic refresh"""
+        leaderboards = cls(min_attempts)
+        values = {}
+        for username in storage.iter_usernames():
+            user_data = storage.get_user(username, recent=0)
+            if user_data is None:
+                continue
+            for key, value in user_metrics(user_data, min_attempts).items():
+                if value is not None:
+                    values.setdefault(key, {})[username] = value
+        leaderboards.boards = {key: RankIndex.from_values(board) for key, board in values.items()}
+        return leaderboards
+
+    def update_user(self, username, user_data, role=None):
+        """Re-rank one user after their record changed; pass the answered role
+        to touch only the global boards and that role's"""
+        metrics = user_metrics(user_data, self.min_attempts, None if role is None else (role,))
+        with self.lock:
+            for key, value in metrics.items():
+                board = self.boards.get(key)
+                if board is None:
+                    if value is None:
+                        continue
+                    board = self.boards[key] = RankIndex()
+                board.set(username, value)
+
+    def top(self, metric, role=None, k=10):
+        """[(username, value), ...] best first"""
+        with self.lock:
+            board = self.boards.get((metric, role))
+            return board.top(k) if board is not None else []
+
+    def rank(self, username, metric, role=None):
+        """(rank, ranked users), or (None, ranked users) if the user isn't ranked"""
+        with self.lock:
+            board = self.boards.get((metric, role))
+            if board is None:
+                return None, 0
+            return board.rank(username), len(board)
+
+_leaderboards_lock = threading.Lock()
+_leaderboards = None
+_rebuilding = False
+
+def _rebuild(storage):
+    global _leaderboards, _rebuilding
+    try:
+        _leaderboards = Leaderboards.build(storage)
+    finally:
+        _rebuilding = False
+
+def get_leaderboards(storage):
+    """Process-wide leaderboards, built on first use
+
+    Updates made through this process are applied as they happen; a stale
+    copy is rebuilt in the background and swapped in, so page views never
+    wait on a full scan after the first one.
+    """
+    global _leaderboards, _rebuilding
+    with _leaderboards_lock:
+        if _leaderboards is None:
+            _leaderboards = Leaderboards.build(storage)
+        elif not _rebuilding and time.monotonic() - _leaderboards.built_at > REFRESH_SECONDS:
+            _rebuilding = True
+            threading.Thread(target=_rebuild, args=(storage,), daemon=True).start()
+        return _leaderboards
+
+def current_leaderboards():
+    """The leaderboards if something has built them already, else None"""
+    return _leaderboards
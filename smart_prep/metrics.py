@@ -0,0 +1,206 @@
+"""Lightweight stage timing with Prometheus text export.
+
+    with timed("render_progress_chart"):
+        ...
+
+    @timed("get_user_stats")
+    def get_user_stats(username):
+        ...
+
+Timings land in fixed-bucket histograms (one per stage) that can be written
+to a file or served over HTTP in the Prometheus text format.
+"""
+import cProfile
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; a +Inf bucket is implied
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_NAME = "smart_prep_stage_seconds"
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count, sum, count]
+
+def observe(stage, seconds):
+    """Record one duration for a stage"""
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+        hist[bisect_left(BUCKETS, seconds)] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+class timed:
+    """Time a block (context manager) or every call of a function (decorator)"""
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, func):
+        stage = self.stage
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+
+def snapshot():
+    """Copy of every histogram: {stage: {'buckets': [...], 'sum': s, 'count': n}}"""
+    with _lock:
+        return {stage: {'buckets': hist[:-2], 'sum': hist[-2], 'count': hist[-1]}
+                for stage, hist in _histograms.items()}
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+def render_prometheus():
+    """All histograms in the Prometheus text exposition format"""
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in instrumented app stages.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for stage, hist in sorted(snapshot().items()):
+        label = stage.replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), hist['buckets']):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {hist["sum"]!r}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {hist["count"]}')
+    lines.extend(_cache_lines())
+    return "\n".join(lines) + "\n"
+
+def _cache_lines():
+    from .cache import cache_stats
+
+    stats = cache_stats()
+    lines = ["# HELP smart_prep_cache_lookups_total Memoized lookups by scope and result.",
+             "# TYPE smart_prep_cache_lookups_total counter"]
+    for result, counts in (('hit', stats['hits']), ('miss', stats['misses'])):
+        for scope, count in counts.items():
+            lines.append(f'smart_prep_cache_lookups_total{{scope="{scope}",result="{result}"}} {count}')
+    lines += ["# HELP smart_prep_cache_evictions_total Entries evicted to stay within the size bound.",
+              "# TYPE smart_prep_cache_evictions_total counter",
+              f"smart_prep_cache_evictions_total {stats['evictions']}",
+              "# HELP smart_prep_cache_entries Entries currently memoized.",
+              "# TYPE smart_prep_cache_entries gauge",
+              f"smart_prep_cache_entries {stats['size']}"]
+    return lines
+
+_last_export = 0.0
+
+def export_prometheus(path, min_interval=5.0):
+    """Atomically write the metrics file, at most once per min_interval seconds"""
+    global _last_export
+    now = time.monotonic()
+    if now - _last_export < min_interval:
+        return False
+    _last_export = now
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+_server = None
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; later calls are no-ops"""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+EXPORT_INTERVAL = float(os.environ.get("INTERVIEW_PREP_METRICS_INTERVAL", "5"))
+_exporters_started = False
+
+def start_metrics_exporters():
+    """Start the exporters set by INTERVIEW_PREP_METRICS_FILE and
+    INTERVIEW_PREP_METRICS_PORT, once per process; later calls are no-ops
+
+    Failures (port in use, unwritable path, a port that isn't a number) are
+    logged, never raised: metrics must not break the page.
+    """
+    global _exporters_started
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    path = os.environ.get("INTERVIEW_PREP_METRICS_FILE")
+    if path:
+        threading.Thread(target=_export_loop, args=(path,), name="metrics-export", daemon=True).start()
+    port = os.environ.get("INTERVIEW_PREP_METRICS_PORT")
+    if port:
+        try:
+            start_metrics_server(int(port))
+        except (OSError, ValueError) as e:
+            print(f"metrics: not serving on port {port!r}: {e}", file=sys.stderr)
+
+def _export_loop(path, interval=EXPORT_INTERVAL):
+    failing = False
+    while True:
+        try:
+            export_prometheus(path, min_interval=0)
+            failing = False
+        except OSError as e:
+            if not failing:  # once per run of failures, not every interval
+                print(f"metrics: can't write {path}: {e}", file=sys.stderr)
+            failing = True
+        time.sleep(interval)
+
+@contextmanager
+def profile_to(path):
+    """cProfile everything inside the block and dump the stats to path"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        profiler.dump_stats(path)
@@ -0,0 +1,447 @@
+"""Streaming migration of a legacy users_data.json into any storage backend.
+
+The snapshot is read with a pull parser (JsonStream) that walks
+users -> scores -> role -> attempts without ever holding more than one
+user's record, so a file larger than the machine's RAM still migrates.
+Events still waiting in users_events.jsonl are replayed per user after
+their snapshot record; the log is compacted at COMPACT_THRESHOLD_BYTES, so
+it is small enough to read up front.
+
+Migration is resumable: finished users are listed in a checkpoint file,
+and a user interrupted halfway keeps the attempts already written: the
+target's per-role attempt counts say how many source attempts to skip.
+"""
+import base64
+import json
+import os
+import re
+
+from .export import LOCKED_PASSWORD
+from .history import decode_scores
+from .storage import (ANSWER_BLOBS_DIR, COMPACTING_FILE, EVENTS_FILE, USERS_FILE, AnswerBlobStore,
+                      flush_pending_writes)
+from .users import new_user_record
+
+CHUNK_SIZE = 1 << 20
+BATCH_SIZE = 10_000
+CHECKPOINT_EVERY = 100
+WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+class JsonStream:
+    """Pull parser over one large JSON document
+
+    keys() and items() walk an object or array without decoding it; the
+    caller reads each member (value(), keys() or items()) before asking for
+    the next one. Only the text of the member being decoded is buffered.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, "" at the end of the document"""
+        while True:
+            self.pos = WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"invalid JSON: {e}") from e
+            # Grow geometrically so a large value isn't re-decoded once per chunk
+            self._fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def keys(self):
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() != ',':
+                self.expect('}')
+                return
+            self.pos += 1
+
+    def items(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self.pos += 1
+
+def iter_legacy_users(path=USERS_FILE, chunk_size=CHUNK_SIZE):
+    """(username, fields, attempts) for each user in a users_data.json snapshot
+
+    `attempts` yields (role, attempt) and, like itertools.groupby, has to be
+    consumed before moving to the next user. `fields` (password, email,
+    log_seq, ...) fills in as the record is read: the keys written before
+    the history are there by the first attempt, the rest once `attempts`
+    is exhausted. Both the packed 'history' layout and the older 'scores'
+    lists are read.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonStream(f, chunk_size)
+        for username in stream.keys():
+            fields = {}
+            attempts = _user_attempts(stream, fields)
+            yield username, fields, attempts
+            for _ in attempts:
+                pass  # whatever the caller didn't read
+
+def _user_attempts(stream, fields):
+    for key in stream.keys():
+        if key == 'scores':
+            for role in stream.keys():
+                for _ in stream.items():
+                    yield role, stream.value()
+        elif key == 'history':
+            for role, history in decode_scores(base64.b64decode(stream.value())).items():
+                for attempt in history:
+                    yield role, attempt
+        else:
+            fields[key] = stream.value()
+
+def legacy_event_files(users_file=USERS_FILE):
+    """The event logs that belong with a snapshot, in replay order"""
+    directory = os.path.dirname(os.path.abspath(users_file))
+    return [os.path.join(directory, os.path.basename(name)) for name in (COMPACTING_FILE, EVENTS_FILE)]
+
+def read_event_log(paths):
+    """{username: [event, ...]} from complete log lines, in log order"""
+    events = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final line
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                events.setdefault(event['user'], []).append(event)
+    return events
+
+def _snapshot_user(fields, attempts, events):
+    """One user's record with a plain {role: [attempt, ...]} history:
+    snapshot attempts, then the logged events not folded into it"""
+    scores = {}
+    for role, attempt in attempts:
+        scores.setdefault(role, []).append(attempt)
+    user_data = dict(fields, scores=scores) if fields else None
+    log_seq = fields.get('log_seq', 0)  # may follow the history in the record
+    for event in events:
+        if event['seq'] <= log_seq:
+            continue
+        if event['op'] == 'signup':
+            if user_data is None:
+                user_data = {k: v for k, v in event['record'].items() if k not in ('scores', 'history')}
+                user_data['scores'] = {}
+        elif user_data is None:
+            continue
+        elif event['op'] in ('score', 'import'):
+            new = event['attempts'] if event['op'] == 'import' else [event['attempt']]
+            user_data['scores'].setdefault(event['role'], []).extend(new)
+        elif event['op'] == 'password':
+            user_data['password'] = event['password']
+        elif event['op'] == 'rescore':
+            for role, new_scores in event['scores'].items():
+                history = user_data['scores'].get(role, [])
+                for i, score in enumerate(new_scores[:len(history)]):
+                    history[i] = dict(history[i], score=score)
+    return user_data
+
+class SnapshotSource:
+    """Read-only view of the JSON backend's files that streams users
+
+    Exports read from it instead of JsonStorage, which loads the whole
+    snapshot first: iter_users() holds one user's history at a time.
+    """
+
+    def __init__(self, users_file=USERS_FILE, event_files=None, answers_dir=None):
+        self.users_file = users_file
+        self.event_files = legacy_event_files(users_file) if event_files is None else event_files
+        if answers_dir is None:
+            answers_dir = os.path.join(os.path.dirname(os.path.abspath(users_file)), ANSWER_BLOBS_DIR)
+        self.blobs = AnswerBlobStore(answers_dir)
+
+    def iter_users(self, usernames=None):
+        """(username, user_data) in snapshot order, then users signed up since"""
+        events = read_event_log(self.event_files)
+        wanted = None if usernames is None else set(usernames)
+        if os.path.exists(self.users_file):
+            for username, fields, attempts in iter_legacy_users(self.users_file):
+                user_events = events.pop(username, [])
+                if wanted is None or username in wanted:
+                    yield username, _snapshot_user(fields, attempts, user_events)
+        for username, user_events in events.items():
+            if wanted is None or username in wanted:
+                user_data = _snapshot_user({}, (), user_events)
+                if user_data is not None:
+                    yield username, user_data
+
+    def get_answer(self, key):
+        return self.blobs.get(key)
+
+# ============================================================================
+# MIGRATION
+# ============================================================================
+
+class _UserWriter:
+    """Appends one user's attempts to the target in per-role batches,
+    skipping the ones an interrupted run already wrote"""
+
+    def __init__(self, target, username, blobs, batch_size):
+        self.target = target
+        self.username = username
+        self.blobs = blobs
+        self.batch_size = batch_size
+        existing = target.get_user(username, recent=0)
+        self.exists = existing is not None
+        self.written = {}  # role -> attempts already in the target
+        if existing is not None:
+            self.written = {role: stats['count'] for role, stats in existing['role_stats'].items()}
+        self.seen = {}
+        self.role, self.batch = None, []
+
+    def create(self, fields):
+        if not self.exists:
+            self.target.add_user(self.username, new_user_record(
+                fields.get('password', LOCKED_PASSWORD), fields.get('email') or '', fields.get('created_at')))
+            self.exists = True
+
+    def add(self, role, attempt):
+        n = self.seen[role] = self.seen.get(role, 0) + 1
+        if n <= self.written.get(role, 0):
+            return
+        if role != self.role or len(self.batch) >= self.batch_size:
+            self.flush()
+            self.role = role
+        item = {'question': attempt['question'], 'score': attempt['score'], 'timestamp': attempt['timestamp']}
+        key = attempt.get('answer_hash')
+        if key is not None:
+            text = self.blobs.get(key) if self.blobs is not None else None
+            item['answer_hash'] = self.target.put_answer(text) if text is not None else key
+        self.batch.append(item)
+
+    def flush(self):
+        if self.batch:
+            self.target.add_attempts(self.username, self.role, self.batch)
+            self.batch = []
+
+def _migrate_user(target, username, fields, attempts, events, blobs, batch_size):
+    writer = _UserWriter(target, username, blobs, batch_size)
+    for role, attempt in attempts:
+        writer.create(fields)
+        writer.add(role, attempt)
+    if fields:
+        writer.create(fields)
+    if 'password' in fields and target.get_password_hash(username) != fields['password']:
+        target.set_password_hash(username, fields['password'])  # written after the history
+    log_seq = fields.get('log_seq', 0)
+    for event in events:
+        if event['seq'] <= log_seq:
+            continue  # already folded into the snapshot
+        if event['op'] == 'signup':
+            record = event['record']
+            writer.create(record)
+        elif event['op'] in ('score', 'import') and writer.exists:
+            for attempt in event['attempts'] if event['op'] == 'import' else [event['attempt']]:
+                writer.add(event['role'], attempt)
+        elif event['op'] == 'password' and writer.exists:
+            writer.flush()
+            target.set_password_hash(username, event['password'])
+        elif event['op'] == 'rescore' and writer.exists:
+            writer.flush()
+            target.set_scores(username, event['scores'])
+    writer.flush()
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r") as f:
+        return {line.rstrip("\n") for line in f if line.endswith("\n")}
+
+def migrate_legacy_users(target, users_file=USERS_FILE, event_files=None, answers_dir=None,
+                         batch_size=BATCH_SIZE, checkpoint=None, checkpoint_every=CHECKPOINT_EVERY,
+                         progress=None):
+    """Copy every user of a legacy snapshot (plus its event log) into `target`
+
+    Returns the number of users migrated by this call. Answer texts are
+    copied from `answers_dir` (default: answer_blobs next to the snapshot);
+    pass answers_dir=False to keep the hashes without copying. With a
+    `checkpoint` path, finished usernames are appended to it every
+    `checkpoint_every` users once they're durable, and skipped next time.
+    `progress(users_done)` is called after each user.
+    """
+    if event_files is None:
+        event_files = legacy_event_files(users_file)
+    if answers_dir is None:
+        answers_dir = os.path.join(os.path.dirname(os.path.abspath(users_file)), ANSWER_BLOBS_DIR)
+    blobs = AnswerBlobStore(answers_dir) if answers_dir and os.path.isdir(answers_dir) else None
+    events = read_event_log(event_files)
+    done = load_checkpoint(checkpoint)
+    migrated, finished = 0, []
+
+    def users():
+        if os.path.exists(users_file):
+            yield from iter_legacy_users(users_file)
+        for username in list(events):
+            yield username, {}, iter(())  # signed up after the snapshot
+
+    checkpoint_file = open(checkpoint, "a") if checkpoint else None
+    try:
+        for username, fields, attempts in users():
+            user_events = events.pop(username, [])
+            if username in done:
+                continue
+            _migrate_user(target, username, fields, attempts, user_events, blobs, batch_size)
+            migrated += 1
+            finished.append(username)
+            if len(finished) >= checkpoint_every:
+                _save_checkpoint(checkpoint_file, finished)
+            if progress is not None:
+                progress(migrated)
+        _save_checkpoint(checkpoint_file, finished)
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+    return migrated
+
+def _save_checkpoint(checkpoint_file, finished):
+    # Only record users whose writes are on disk
+    flush_pending_writes()
+    if checkpoint_file is not None:
+        checkpoint_file.writelines(username + "\n" for username in finished)
+        checkpoint_file.flush()
+    finished.clear()
+
+# ============================================================================
+# VERIFICATION
+# ============================================================================
+
+def _source_scores(fields, attempts, events):
+    """{role: [score, ...]} for one user (snapshot attempts, then logged
+    events), and the [total_questions, correct_answers] the source keeps,
+    carried through the same events the way apply_event does"""
+    scores = {}
+    for role, attempt in attempts:
+        scores.setdefault(role, []).append(attempt['score'])
+    stored = [fields.get('total_questions', 0), fields.get('correct_answers', 0)]
+    log_seq = fields.get('log_seq', 0)  # may follow the history in the record
+    for event in events:
+        if event['seq'] <= log_seq:
+            continue
+        if event['op'] in ('score', 'import'):
+            for attempt in event['attempts'] if event['op'] == 'import' else [event['attempt']]:
+                scores.setdefault(event['role'], []).append(attempt['score'])
+                stored[0] += 1
+                stored[1] += attempt['score'] >= 70
+        elif event['op'] == 'rescore':
+            for role, new_scores in event['scores'].items():
+                if role in scores:
+                    scores[role][:len(new_scores)] = new_scores[:len(scores[role])]
+            stored[1] = sum(1 for role_scores in scores.values() for s in role_scores if s >= 70)
+    return scores, stored
+
+def _close(a, b):
+    # Packed histories keep float32 scores
+    return abs(a - b) <= max(1e-4, 1e-6 * max(abs(a), abs(b)))
+
+def verify_migration(target, users_file=USERS_FILE, event_files=None):
+    """Compare per-user totals between the legacy files and `target`
+
+    Returns [(username, what, source value, target value), ...] for every
+    difference in total_questions, correct_answers, or a role's attempt
+    count or average score, and for users the target has but the source
+    doesn't ('unexpected'); empty when the migration is complete. The
+    counters are checked twice: recounted from the source attempts, and as
+    stored in the source records ('... (stored)'), which the migration
+    doesn't copy, so a source whose counters disagree with its own history
+    is reported too.
+    """
+    if event_files is None:
+        event_files = legacy_event_files(users_file)
+    events = read_event_log(event_files)
+    mismatches = []
+    seen = set()
+
+    def users():
+        if os.path.exists(users_file):
+            yield from iter_legacy_users(users_file)
+        for username in list(events):
+            yield username, {}, iter(())
+
+    for username, fields, attempts in users():
+        seen.add(username)
+        scores, stored = _source_scores(fields, attempts, events.pop(username, []))
+        user_data = target.get_user(username, recent=0)
+        if user_data is None:
+            mismatches.append((username, 'missing', sum(map(len, scores.values())), None))
+            continue
+        total = sum(len(role_scores) for role_scores in scores.values())
+        correct = sum(1 for role_scores in scores.values() for s in role_scores if s >= 70)
+        if total != user_data['total_questions']:
+            mismatches.append((username, 'total_questions', total, user_data['total_questions']))
+        if correct != user_data['correct_answers']:
+            mismatches.append((username, 'correct_answers', correct, user_data['correct_answers']))
+        if stored[0] != user_data['total_questions']:
+            mismatches.append((username, 'total_questions (stored)', stored[0], user_data['total_questions']))
+        if stored[1] != user_data['correct_answers']:
+            mismatches.append((username, 'correct_answers (stored)', stored[1], user_data['correct_answers']))
+        role_stats = user_data['role_stats']
+        for role in set(scores) | set(role_stats):
+            want = scores.get(role, [])
+            have = role_stats.get(role, {'count': 0, 'sum': 0.0})
+            if len(want) != have['count']:
+                mismatches.append((username, f"{role} count", len(want), have['count']))
+            elif want and not _close(sum(want) / len(want), have['sum'] / have['count']):
+                mismatches.append((username, f"{role} average", sum(want) / len(want),
+                                   have['sum'] / have['count']))
+    for username in target.iter_usernames():
+        if username not in seen:
+            user_data = target.get_user(username, recent=0)
+            mismatches.append((username, 'unexpected', None,
+                               user_data['total_questions'] if user_data else None))
+    return mismatches
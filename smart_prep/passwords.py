@@ -0,0 +1,70 @@
+"""Salted scrypt password hashing, run on a bounded worker pool.
+
+Hashes are stored as "scrypt$n$r$p$salt$digest", so every user carries the
+parameters they were hashed with. Legacy unsalted SHA-256 hashes still verify
+and are reported as needing an upgrade, which verify_user does on the next
+successful login. The KDF runs on a small thread pool (hashlib.scrypt
+releases the GIL), so a burst of logins is capped at KDF_WORKERS cores
+instead of stalling every session's reruns.
+"""
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+SALT_BYTES = 16
+
+KDF_WORKERS = int(os.environ.get("INTERVIEW_PREP_KDF_WORKERS", "2"))
+# Logins allowed to wait for or hold a worker at once; beyond that, fail fast
+KDF_MAX_PENDING = int(os.environ.get("INTERVIEW_PREP_KDF_MAX_PENDING", "64"))
+KDF_WAIT_SECONDS = 10.0
+
+class KdfBusyError(RuntimeError):
+    """Too many password hashes are already queued"""
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * (n + p + 2), dklen=SCRYPT_DKLEN)
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Salted scrypt hash with its parameters encoded alongside"""
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${salt.hex()}${digest.hex()}"
+
+def check_password(password, stored_hash):
+    """Return (matches, needs_upgrade) for a stored hash of either format"""
+    if stored_hash.startswith("scrypt$"):
+        _, n, r, p, salt, digest = stored_hash.split("$")
+        n, r, p = int(n), int(r), int(p)
+        computed = _scrypt(password, bytes.fromhex(salt), n, r, p).hex()
+        weaker = (n, r, p) < (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return hmac.compare_digest(computed, digest), weaker
+    # Legacy: single unsalted SHA-256
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, stored_hash), True
+
+_pool_lock = threading.Lock()
+_pool = None
+_pending = threading.BoundedSemaphore(KDF_MAX_PENDING)
+
+def get_kdf_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+        return _pool
+
+def run_kdf(fn, *args):
+    """Run a CPU-heavy password function on the KDF pool and wait for it"""
+    if not _pending.acquire(timeout=KDF_WAIT_SECONDS):
+        raise KdfBusyError("Too many logins in progress, please try again")
+    try:
+        return get_kdf_pool().submit(fn, *args).result()
+    finally:
+        _pending.release()
@@ -0,0 +1,54 @@
+"""Progress chart data served from the per-user time-bucketed rollups."""
+from datetime import date
+
+MAX_CHART_POINTS = 60
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of [(x, y), ...] sorted by x"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    every = (n - 2) / (threshold - 2)
+    sampled = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        # Average of the next bucket is the third corner of the triangle
+        nxt = points[end:min(int((i + 2) * every) + 1, n)] or points[-1:]
+        avg_x = sum(x for x, _ in nxt) / len(nxt)
+        avg_y = sum(y for _, y in nxt) / len(nxt)
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def role_series(rollups, max_points=MAX_CHART_POINTS):
+    """[(date, mean score), ...] for one role, daily while the daily buckets
+    still cover the whole history, weekly after that"""
+    day_count = sum(bucket[0] for bucket in rollups['day'].values())
+    week_count = sum(bucket[0] for bucket in rollups['week'].values())
+    buckets = rollups['day'] if day_count == week_count else rollups['week']
+    points = sorted((date.fromisoformat(key).toordinal(), total / count)
+                    for key, (count, total, _) in buckets.items())
+    return [(date.fromordinal(x), y) for x, y in lttb(points, max_points)]
+
+def progress_chart_data(rollups, max_points=MAX_CHART_POINTS):
+    """Long-format chart table {'Date': [...], 'Score': [...], 'Role': [...]}
+
+    Work depends only on the number of buckets (bounded by the daily
+    retention window and then one per week), never on the attempt count.
+    """
+    data = {'Date': [], 'Score': [], 'Role': []}
+    for role, role_rollups in rollups.items():
+        for day, score in role_series(role_rollups, max_points):
+            data['Date'].append(day)
+            data['Score'].append(score)
+            data['Role'].append(role)
+    return data
@@ -0,0 +1,312 @@
+"""Built-in question bank and how questions are compiled for scoring."""
+import hashlib
+
+from .scoring import WORD_RE, extract_keywords, keyword_matcher
+
+# =========================
+# Role descriptions
+# =========================
+role_descriptions = {
+    "Software Developer/Engineer": """Build applications, websites, and software solutions.
+Work with languages like Java, Python, C++, JavaScript. Collaborate to design features, fix bugs, and ship reliable software.""",
+
+    "Web Developer – Frontend": """Create responsive, accessible user interfaces using HTML, CSS, and JavaScript frameworks (React, Angular, Vue).
+Optimize performance, cross-browser behavior, and UX.""",
+
+    "Web Developer – Backend": """Implement server-side logic, APIs, and integrations using Node.js, Python, Java, or PHP.
+Manage auth, data access, performance, security, and reliability.""",
+
+    "Web Developer – Full-Stack": """Work across frontend and backend. Design APIs, build UI, manage data models, and deploy apps.
+Own end-to-end features and developer experience.""",
+
+    "Data Analyst / Data Scientist": """Extract insights from data using Python/R/SQL. Build dashboards and visualizations (Excel/Tableau/Power BI).
+For DS: apply statistics and ML to model, predict, and experiment.""",
+
+    "Quality Assurance (QA) Engineer": """Test apps to find bugs early. Design test plans/cases, automate with tools like Selenium, Playwright, JUnit, PyTest.
+Champion quality gates and CI test health.""",
+
+    "Database Administrator (DBA)": """Install, configure, and maintain databases (e.g., MySQL, PostgreSQL, Oracle).
+Optimize performance, ensure backups, replication, high availability, and security.""",
+
+    "System Administrator": """Manage servers, operating systems, user accounts, and networks.
+Automate provisioning, patching, monitoring, and incident response.""",
+
+    "Cybersecurity Analyst": """Protect systems and data from threats. Monitor logs, investigate alerts, harden configurations,
+run vulnerability scans, and support incident response and compliance.""",
+
+    "DevOps Engineer": """Bridge dev and ops. Automate CI/CD, infra as code, observability, and cloud operations (AWS/Azure/GCP).
+Drive reliability, scalability, and fast, safe delivery."""
+}
+
+# =========================
+# Questions & Answers - COMPLETE DATA
+# =========================
+QA = {}
+
+QA["Software Developer/Engineer"] = [
+    ("Difference between procedural and OOP?",
+     "Procedural organizes code as procedures and data; OOP organizes as classes/objects with encapsulation, inheritance, polymorphism, abstraction."),
+    ("Explain SOLID principles.",
+     "SRP, OCP, LSP, ISP, DIP — design for modularity, substitutability, small interfaces, and dependency on abstractions."),
+    ("Stack vs Heap?",
+     "Stack: automatic storage for frames; fast, limited. Heap: dynamic allocation; larger, needs GC/free."),
+    ("Types of testing?",
+     "Unit, Integration, System, Acceptance, Regression, Smoke, Performance."),
+    ("Git workflow you follow?",
+     "Feature branches + PRs; commit small; rebase/merge; code reviews; CI checks."),
+    ("Abstract class vs Interface?",
+     "Abstract class can have state and default methods; interface defines contracts; languages vary on multiple inheritance."),
+    ("Common design patterns?",
+     "Singleton, Factory, Strategy, Observer, Adapter, Decorator, Repository, MVC/MVVM."),
+    ("Big-O examples?",
+     "O(1) hash get, O(log n) binary search, O(n) scan, O(n log n) sort, O(n²) bubble."),
+    ("What is polymorphism?",
+     "Same interface, different implementations; compile-time overloading, run-time overriding."),
+    ("Process vs Thread?",
+     "Process: isolated address space. Thread: shares process memory; lower overhead.")
+]
+
+QA["Web Developer – Frontend"] = [
+    ("Critical rendering path?",
+     "Steps from HTML/CSS/JS to pixels: parse HTML→DOM, CSS→CSSOM, render tree, layout, paint, composite."),
+    ("Reflow vs repaint?",
+     "Reflow (layout) recalculates geometry; repaint updates visuals without layout."),
+    ("CSS specificity order?",
+     "Inline > ID > class/attr/pseudo-class > element/pseudo-element; later wins on tie; !important overrides in scope."),
+    ("Flexbox vs Grid?",
+     "Flexbox for 1D alignment; Grid for 2D layouts and precise placement."),
+    ("React reconciliation?",
+     "Diff virtual DOM trees, minimal real DOM updates via keys and heuristics."),
+    ("Controlled vs uncontrolled components?",
+     "Controlled: state via React; Uncontrolled: DOM holds state via refs."),
+    ("Hooks rules?",
+     "Call at top level and only in React functions; consistent order."),
+    ("useMemo vs useCallback?",
+     "useMemo memoizes values; useCallback memoizes function references."),
+    ("Key prop purpose?",
+     "Stable identity for list items to optimize diffing and avoid state bugs."),
+    ("SSR vs CSR vs SSG?",
+     "SSR: HTML on server; CSR: browser renders; SSG: prebuilt. Trade SEO, TTFB, interactivity.")
+]
+
+QA["Web Developer – Backend"] = [
+    ("REST vs RPC vs GraphQL?",
+     "REST resource-based; RPC procedure calls; GraphQL client-driven queries and types."),
+    ("Statelessness importance?",
+     "Simplifies scaling, caching, retries; store session in tokens or shared store."),
+    ("Authentication vs Authorization?",
+     "AuthN verifies identity; AuthZ checks permissions; implement least privilege."),
+    ("JWT pros/cons?",
+     "Self-contained claims enable stateless auth; watch size, revocation, expiry, signing."),
+    ("Database transactions & ACID?",
+     "Atomicity, Consistency, Isolation, Durability; ensure correctness under concurrency."),
+    ("Indexes and trade-offs?",
+     "Speed reads, slow writes; extra storage; choose selective columns."),
+    ("N+1 query problem?",
+     "Many small queries due to per-row fetch; fix with joins, batching, eager loading."),
+    ("Rate limiting strategies?",
+     "Token bucket, leaky bucket, fixed/sliding windows; store counters in Redis."),
+    ("Idempotency keys?",
+     "Deduplicate retries for POST-like operations; store request ID and result."),
+    ("Message queues usage?",
+     "Decouple services, buffer spikes, async processing; e.g., RabbitMQ, Kafka, SQS.")
+]
+
+QA["Web Developer – Full-Stack"] = [
+    ("Design a full-stack feature end-to-end.",
+     "Define API schema, DB model, validations, auth, UI states, loading/errors; ship with tests and telemetry."),
+    ("Choosing tech stack?",
+     "Based on team expertise, requirements, scale, ecosystem, hiring pool, and ops maturity."),
+    ("Monolith vs microservices?",
+     "Start monolith for speed; split by bounded contexts when needed; consider operational cost."),
+    ("SPA + API security?",
+     "Short-lived tokens, refresh flow, HTTPS, SameSite cookies, CSRF protection if cookies."),
+    ("Data fetching patterns?",
+     "SWR/React Query for server state; cache, revalidate, optimistic updates."),
+    ("Form validation full-stack?",
+     "Shared schema (e.g., JSON Schema/Zod) for client+server parity; sanitize on server."),
+    ("Upload UX considerations?",
+     "Progress UI, chunking, retries, drag-drop, validations, accessibility."),
+    ("Error handling UX?",
+     "Inline errors, retry buttons, fallback UI, logging with user/session context."),
+    ("Internationalization (i18n)?",
+     "Message catalogs, locale formatting, RTL support, date/number rules."),
+    ("Feature flags?",
+     "Progressive rollout, A/B tests, kill switches; guard risky changes.")
+]
+
+QA["Data Analyst / Data Scientist"] = [
+    ("Population vs sample?",
+     "Population: entire set; sample: subset; use sampling to estimate population metrics."),
+    ("Bias vs variance trade-off?",
+     "Low bias models fit complex patterns but risk high variance; balance via regularization/validation."),
+    ("p-value meaning?",
+     "Probability of observing data as extreme assuming null hypothesis is true."),
+    ("Confidence interval?",
+     "Range likely to contain true parameter at given confidence (e.g., 95%)."),
+    ("Feature scaling?",
+     "Standardization/normalization to help gradient methods and distance-based models."),
+    ("Train/validation/test split?",
+     "Hold out test; use CV for model selection to avoid overfitting."),
+    ("Cross-validation types?",
+     "k-fold, stratified, time-series CV with rolling windows."),
+    ("Overfitting detection?",
+     "High train, low validation performance; use regularization, more data, simpler model."),
+    ("Regularization L1 vs L2?",
+     "L1 induces sparsity; L2 shrinks weights; elastic net combines."),
+    ("Precision vs recall vs F1?",
+     "Precision: correctness of positives; Recall: coverage; F1 balances.")
+]
+
+QA["Quality Assurance (QA) Engineer"] = [
+    ("Difference: QA vs QC vs Testing?",
+     "QA: process-oriented; QC: product checks; Testing: executes tests to find defects."),
+    ("Test pyramid?",
+     "Many unit, fewer integration, few e2e; optimize speed and coverage."),
+    ("Test case vs test scenario?",
+     "Scenario: high-level behavior; Case: detailed steps, data, expected results."),
+    ("Bug lifecycle?",
+     "New → Assigned → In-progress → Fixed → Retest → Verified → Closed (or Reopen)."),
+    ("Severity vs priority?",
+     "Severity: impact; Priority: fix order/urgency."),
+    ("Smoke vs sanity testing?",
+     "Smoke: basic build checks; Sanity: focused verification after small changes."),
+    ("Black-box vs white-box?",
+     "Black-box ignores internals; white-box uses code knowledge; grey-box mixes."),
+    ("Boundary value analysis?",
+     "Test edges and just-inside/outside values to catch off-by-ones."),
+    ("Equivalence partitioning?",
+     "Group inputs into valid/invalid classes to reduce cases."),
+    ("Exploratory testing?",
+     "Charter-driven, simultaneous learning, design, execution; record notes.")
+]
+
+QA["Database Administrator (DBA)"] = [
+    ("Normalization forms?",
+     "1NF remove repeating groups; 2NF remove partial dependencies; 3NF remove transitive; BCNF stricter."),
+    ("Index types?",
+     "B-tree, hash, bitmap, GiST/Gin; clustered vs non-clustered."),
+    ("When to use composite indexes?",
+     "Frequent multi-column filters; order matches query predicates."),
+    ("Query plan analysis?",
+     "EXPLAIN/EXPLAIN ANALYZE to inspect scans, joins, costs, cardinality."),
+    ("Isolation levels?",
+     "Read uncommitted, committed, repeatable read, serializable; anomalies prevented vary."),
+    ("Replication options?",
+     "Synchronous vs async, logical vs physical; primary-replica setups."),
+    ("Backups: full vs incremental?",
+     "Full captures all; incremental/differential only changes; test restores regularly."),
+    ("Point-in-time recovery?",
+     "Use WAL/binlogs + base backups to restore to specific timestamp."),
+    ("Sharding vs partitioning?",
+     "Sharding splits across nodes; partitioning splits within a node/table by key."),
+    ("Hot vs cold standby?",
+     "Hot can serve reads; cold requires promote/restore on failover.")
+]
+
+QA["System Administrator"] = [
+    ("What is DNS and its record types?",
+     "A system to resolve names→IPs; A/AAAA, CNAME, MX, TXT, NS, SRV."),
+    ("DHCP role?",
+     "Automatically assigns IPs, gateways, DNS to clients."),
+    ("Linux boot process?",
+     "Firmware→bootloader→kernel→init/systemd→services."),
+    ("Runlevels/systemd targets?",
+     "Legacy runlevels map to systemd targets like multi-user, graphical."),
+    ("SSH hardening?",
+     "Disable root login/passwords, use keys, change port, fail2ban, MFA."),
+    ("Firewall basics?",
+     "Default-deny inbound; open minimal ports; stateful rules; log drops."),
+    ("Monitoring stack?",
+     "Metrics, logs, traces; Prometheus/Grafana/ELK/CloudWatch."),
+    ("Backup strategy 3-2-1?",
+     "3 copies, 2 media, 1 off-site; test restores."),
+    ("RAID levels?",
+     "RAID0 stripe, 1 mirror, 5 parity, 10 mirror+stripe; trade speed/fault tolerance."),
+    ("Filesystem choices?",
+     "ext4, XFS, ZFS (snapshots, checksums); choose per workload.")
+]
+
+QA["Cybersecurity Analyst"] = [
+    ("CIA triad?",
+     "Confidentiality, Integrity, Availability."),
+    ("Threat vs vulnerability vs risk?",
+     "Threat: potential harm; Vulnerability: weakness; Risk: likelihood×impact."),
+    ("Zero trust?",
+     "Never trust, always verify; continuous authZ, micro-segmentation, least privilege."),
+    ("Common attack vectors?",
+     "Phishing, credential stuffing, XSS, SQLi, RCE, ransomware, supply chain."),
+    ("Defense in depth?",
+     "Multiple controls: network, endpoint, identity, app, data, physical."),
+    ("SIEM purpose?",
+     "Aggregate logs, correlate alerts, support detection and investigation."),
+    ("IDS/IPS?",
+     "Detects intrusions; IPS can block in-line; signature + anomaly detection."),
+    ("Vulnerability scanning vs pentest?",
+     "Automated breadth vs manual depth/exploitation."),
+    ("SOC tiers?",
+     "Tier 1 triage, Tier 2 investigation, Tier 3 threat hunting/IR."),
+    ("MITRE ATT&CK?",
+     "Knowledge base of adversary tactics/techniques to map detections.")
+]
+
+QA["DevOps Engineer"] = [
+    ("CI vs CD?",
+     "CI builds/tests frequently; CD automates delivery/deployments."),
+    ("Blue-green vs canary?",
+     "Blue-green swaps environments; canary gradually shifts traffic to new version."),
+    ("Infrastructure as Code?",
+     "Declarative reproducible infra (Terraform/CloudFormation); reviewable and versioned."),
+    ("Containers vs VMs?",
+     "Containers share kernel, lighter; VMs isolate OS, heavier."),
+    ("Kubernetes primitives?",
+     "Pod, Deployment, Service, Ingress, ConfigMap/Secret, StatefulSet, Job/CronJob."),
+    ("Service mesh purpose?",
+     "mTLS, traffic policies, retries, observability between services (e.g., Istio/Linkerd)."),
+    ("GitOps?",
+     "Desired state in Git; reconciler applies changes; auditable rollbacks."),
+    ("Observability stack?",
+     "Metrics, logs, traces; SLOs, error budgets; alert on symptoms."),
+    ("Autoscaling types?",
+     "Horizontal/vertical; based on CPU, custom metrics, queue depth."),
+    ("Secrets in CI/CD?",
+     "Store in vaults; short-lived tokens; masked logs; scoped permissions.")
+]
+
+# Build structure
+questions_answers = {role: QA.get(role, []) for role in role_descriptions.keys()}
+
+# =========================
+# Question bank index
+# =========================
+def question_id(role, question):
+    """Stable ID for a question: survives reordering of the bank"""
+    return hashlib.sha1(f"{role}\x1f{question}".encode()).hexdigest()[:12]
+
+def compile_question(role, question, answer):
+    """Precompute everything scoring needs from a model answer"""
+    answer_lower = answer.lower()
+    keywords = tuple(extract_keywords(answer, max_terms=8))
+    return {
+        'id': question_id(role, question),
+        'role': role,
+        'question': question,
+        'answer': answer,
+        'answer_lower': answer_lower,
+        'answer_length': len(answer),
+        'answer_tokens': frozenset(WORD_RE.findall(answer_lower)),
+        'keywords': keywords,
+        'matcher': keyword_matcher(keywords)
+    }
+
+def build_question_index(bank):
+    """Compile a {role: [(question, answer), ...]} bank into keyed lookups"""
+    index = {'by_id': {}, 'by_role': {}, 'by_question': {}}
+    for role, qa_list in bank.items():
+        ids = index['by_role'][role] = []
+        for question, answer in qa_list:
+            entry = compile_question(role, question, answer)
+            index['by_id'][entry['id']] = entry
+            index['by_question'][(role, question)] = entry['id']
+            ids.append(entry['id'])
+    return index
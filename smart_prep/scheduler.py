@@ -0,0 +1,113 @@
+"""SM-2 spaced repetition: which question a user should practice next.
+
+Each role a user has practiced keeps a schedule on the user record:
+
+    {'cards': {question_id: [reps, interval_days, ease, due]},
+     'heap': [[due, question_id], ...],   # min-heap on due (epoch seconds)
+     'next_new': n}                       # bank questions already introduced
+
+Every answer re-schedules one card in O(log n) by pushing a fresh heap
+entry; the card's old entry goes stale and is dropped once it reaches the
+top, so after each update the top of the heap is always live and picking
+the next due question is O(1). Cards whose question has since left the bank
+(an edited bank, a new INTERVIEW_PREP_QUESTIONS) are skipped when picking.
+Unseen questions are introduced in bank order through the next_new cursor.
+"""
+import heapq
+from datetime import datetime
+
+from .history import to_epoch
+from .bank import get_question_bank
+from .questions import question_id
+
+DAY = 86400
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+def new_schedule():
+    return {'cards': {}, 'heap': [], 'next_new': 0}
+
+def quality(score):
+    """0-100 score -> SM-2 answer quality 0-5 (3+ counts as recalled, like 70+ counts as correct)"""
+    for q, floor in ((5, 90), (4, 80), (3, 70), (2, 50), (1, 30)):
+        if score >= floor:
+            return q
+    return 0
+
+def review(card, q, when):
+    """SM-2 step for one card; returns the new [reps, interval_days, ease, due]"""
+    reps, interval, ease, _ = card or (0, 0, INITIAL_EASE, 0)
+    if q < 3:
+        reps, interval = 0, 1
+    else:
+        reps += 1
+        interval = 1 if reps == 1 else 6 if reps == 2 else round(interval * ease)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    return [reps, interval, ease, when + interval * DAY]
+
+def update_schedule(schedule, role, question, score, timestamp):
+    """Fold one answer into a role's schedule"""
+    qid = question_id(role, question)
+    if qid not in get_question_bank():
+        return  # no longer in the bank, so it can't be asked again
+    cards, heap = schedule['cards'], schedule['heap']
+    card = cards[qid] = review(cards.get(qid), quality(score), to_epoch(timestamp))
+    heapq.heappush(heap, [card[3], qid])
+    # Drop stale entries (cards re-scheduled since) that surfaced at the top
+    while heap and cards[heap[0][1]][3] != heap[0][0]:
+        heapq.heappop(heap)
+    if len(heap) > 2 * len(cards) + 16:  # too many buried stale entries
+        bank = get_question_bank()
+        heap[:] = [[card[3], qid] for qid, card in cards.items() if qid in bank]
+        heapq.heapify(heap)
+    ids = get_question_bank().role_ids(role)
+    while schedule['next_new'] < len(ids) and ids[schedule['next_new']] in cards:
+        schedule['next_new'] += 1
+
+def rebuild_schedules(scores):
+    """Replay a whole attempt history into fresh schedules"""
+    schedules = {}
+    for role, attempts in scores.items():
+        schedule = schedules[role] = new_schedule()
+        for item in attempts:
+            update_schedule(schedule, role, item['question'], item['score'], item['timestamp'])
+    return schedules
+
+def _due_cards(schedule, bank):
+    """(due, question_id) of live cards still in the bank, soonest first
+
+    Walks the heap in order without popping it, so skipping k dead entries
+    costs O(k log k) and the stored schedule is left alone.
+    """
+    heap, cards = schedule['heap'], schedule['cards']
+    frontier = [(heap[0][0], 0)] if heap else []
+    while frontier:
+        due, i = heapq.heappop(frontier)
+        qid = heap[i][1]
+        card = cards.get(qid)
+        if card is not None and card[3] == due and qid in bank:
+            yield due, qid
+        for child in (2 * i + 1, 2 * i + 2):
+            if child < len(heap):
+                heapq.heappush(frontier, (heap[child][0], child))
+
+def next_question(schedule, role, now=None):
+    """(question_id, reason) to practice next in a role, or None if it has no questions
+
+    An overdue review comes first ('review'), then an unseen question
+    ('new'), then the review that falls due soonest ('ahead').
+    """
+    if now is None:
+        now = to_epoch(datetime.now().isoformat())
+    schedule = schedule or new_schedule()
+    bank = get_question_bank()
+    soonest = next(_due_cards(schedule, bank), None)
+    if soonest is not None and soonest[0] <= now:
+        return soonest[1], 'review'
+    ids = bank.role_ids(role)
+    for i in range(schedule['next_new'], len(ids)):
+        if ids[i] not in schedule['cards']:
+            return ids[i], 'new'
+    if soonest is not None:
+        return soonest[1], 'ahead'
+    return None
@@ -0,0 +1,191 @@
+"""Answer scoring and keyword extraction."""
+import functools
+import os
+import re
+
+# =========================
+# SCORING SYSTEM
+# =========================
+
+WORD_RE = re.compile(r'\b\w+\b')
+# Words, whitespace runs and single symbols. Keywords never contain
+# whitespace, so a whitespace token always breaks a partial match.
+TOKEN_RE = re.compile(r'\w+|\s+|\S')
+KEYWORD_STEMMING = os.environ.get("INTERVIEW_PREP_KEYWORD_STEMMING") == "1"
+
+def light_stem(word):
+    """Crude suffix stripping (plurals, -ing, -ed), so indexes and indexing match index"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over tokens, so keywords only match whole words
+
+    A keyword is split into tokens ("node.js" -> node . js) and matches
+    where the answer has the same tokens in a row: "api" matches "an API,"
+    but not "rapid". Keywords of a single word (most of them) are found by
+    intersecting with the answer's word set; the automaton is only run when
+    a word from a longer keyword occurs.
+    """
+
+    def __init__(self, keywords, stem=KEYWORD_STEMMING):
+        self.keywords = tuple(keywords)
+        self.stem = stem
+        self.single = {}    # token -> keywords that are just that token
+        self.anchors = set()  # word tokens of the multi-token keywords
+        self.always_scan = False
+        self.goto, self.fail, self.out = [{}], [0], [()]
+        for keyword in self.keywords:
+            tokens = self._tokens(keyword)
+            if len(tokens) == 1:
+                self.single.setdefault(tokens[0], []).append(keyword)
+                continue
+            words = {t for t in tokens if WORD_RE.fullmatch(t)}
+            self.anchors |= words
+            self.always_scan |= not words
+            self._insert(tokens, keyword)
+        self._link()
+
+    def _tokens(self, text):
+        tokens = TOKEN_RE.findall(text)
+        return [light_stem(t) for t in tokens] if self.stem else tokens
+
+    def _insert(self, tokens, keyword):
+        state = 0
+        for token in tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = self.goto[state][token] = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        self.out[state] += (keyword,)
+
+    def _link(self):
+        """Breadth-first failure links; outputs inherit along them"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for token, nxt in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(token, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+                queue.append(nxt)
+
+    def match(self, lower, words=None):
+        """Set of keywords found in an already lowercased answer
+
+        `words` is set(WORD_RE.findall(lower)) if the caller has it already.
+        """
+        if words is None:
+            words = set(WORD_RE.findall(lower))
+        if self.stem:
+            words = {light_stem(w) for w in words}
+        found = set()
+        for token in self.single.keys() & words:
+            found.update(self.single[token])
+        if self.multi and (self.always_scan or not self.anchors.isdisjoint(words)):
+            found |= self.scan(lower)
+        return found
+
+    @property
+    def multi(self):
+        """Whether any keyword spans several tokens"""
+        return len(self.goto) > 1
+
+    def scan(self, lower):
+        """Multi-token keywords found by running the automaton over the answer"""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for token in self._tokens(lower):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+@functools.lru_cache(maxsize=4096)
+def keyword_matcher(keywords):
+    """Shared matcher for a tuple of keywords"""
+    return KeywordMatcher(keywords)
+
+def analyze_answer(user_answer, entry):
+    """One pass over an answer: the keywords it covers and misses and the
+    model-answer words it shares (the feedback and the score both use it)"""
+    return _analyze(user_answer, entry['answer_tokens'], entry['matcher'])
+
+def _analyze(user_answer, model_words, matcher):
+    lower = user_answer.lower()
+    words = set(WORD_RE.findall(lower))
+    found = matcher.match(lower, words)
+    return {
+        'matched': [k for k in matcher.keywords if k in found],
+        'missed': [k for k in matcher.keywords if k not in found],
+        'overlap': words & model_words,
+        'words': words,
+    }
+
+def _score_parts(user_answer, model_length, model_words, analysis):
+    # Keyword matching (40% of score)
+    keywords = len(analysis['matched']) + len(analysis['missed'])
+    keyword_score = (len(analysis['matched']) / keywords) * 40 if keywords else 0
+    
+    # Length appropriateness (20% of score)
+    length_ratio = min(len(user_answer) / max(model_length, 1), 1.0)
+    length_score = length_ratio * 20
+    
+    # Word overlap with model answer (40% of score)
+    overlap_score = (len(analysis['overlap']) / len(model_words)) * 40 if model_words else 0
+    
+    total_score = keyword_score + length_score + overlap_score
+    return min(total_score, 100)  # Cap at 100
+
+def calculate_score(user_answer, model_answer, keywords):
+    """Calculate score based on keyword matching and answer quality"""
+    model_words = set(WORD_RE.findall(model_answer.lower()))
+    analysis = _analyze(user_answer, model_words, keyword_matcher(tuple(keywords)))
+    return _score_parts(user_answer, len(model_answer), model_words, analysis)
+
+def score_question(user_answer, entry, analysis=None):
+    """Score against a compiled question entry; only the user's answer is tokenized"""
+    if analysis is None:
+        analysis = analyze_answer(user_answer, entry)
+    return _score_parts(user_answer, entry['answer_length'], entry['answer_tokens'], analysis)
+
+# =========================
+# Small helpers
+# =========================
+STOPWORDS = {
+    "the","a","an","and","or","but","if","then","else","for","while","to","from","of","in","on",
+    "with","by","as","is","are","was","were","be","been","being","at","it","its","this","that",
+    "those","these","he","she","they","we","you","your","yours","our","ours","their","theirs",
+    "do","does","did","done","doing","i","me","my","mine","into","about","via","over","under"
+}
+
+KEYWORD_RE = re.compile(r"[A-Za-z0-9\-\+\.#]+")
+
+def keyword_terms(text):
+    """Lowercased terms in order, without stopwords and words under three characters"""
+    return [w for w in KEYWORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2]
+
+def extract_keywords(answer_text, max_terms=8):
+    terms = keyword_terms(answer_text)
+    # prioritize unique order-preserving
+    seen = set()
+    uniq = []
+    for t in terms:
+        if t not in seen:
+            seen.add(t)
+            uniq.append(t)
+    return uniq[:max_terms]
@@ -0,0 +1,134 @@
+"""BM25 full-text search over every role's questions and model answers."""
+import math
+import threading
+from array import array
+from collections import Counter
+
+from .bank import get_question_bank
+from .cache import memoize_static
+from .scoring import keyword_terms
+
+K1 = 1.2
+B = 0.75
+
+def search_terms(text):
+    """Terms as extract_keywords sees them, minus sentence-ending dots"""
+    return [term for term in [t.rstrip(".") for t in keyword_terms(text)] if term]
+
+class SearchIndex:
+    """Inverted index: term -> parallel arrays of document numbers and term counts
+
+    Documents are appended, never removed, so postings stay sorted by
+    document number and adding a question only appends to a few arrays.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.doc_ids = []            # document number -> question ID
+        self.doc_roles = array('H')  # document number -> position in self.roles
+        self.doc_lengths = array('I')
+        self.total_length = 0
+        self.roles = []
+        self.indexed = {}            # role -> how many of its bank questions are indexed
+
+    def add(self, qid, role, text):
+        terms = search_terms(text)
+        counts = Counter(terms)
+        with self.lock:
+            doc = len(self.doc_ids)
+            if role not in self.indexed:
+                self.indexed[role] = 0
+                self.roles.append(role)
+            self.doc_ids.append(qid)
+            self.doc_roles.append(self.roles.index(role))
+            self.doc_lengths.append(len(terms))
+            self.total_length += len(terms)
+            self.indexed[role] += 1
+            postings = self.postings
+            for term, count in counts.items():
+                posting = postings.get(term)
+                if posting is None:
+                    posting = postings[term] = (array('I'), array('I'))
+                posting[0].append(doc)
+                posting[1].append(count)
+
+    def sync(self, bank):
+        """Index the bank's questions that aren't indexed yet"""
+        for role in bank.roles:
+            ids = bank.role_ids(role)
+            for qid in ids[self.indexed.get(role, 0):]:
+                _, question, answer = bank.record(qid)
+                self.add(qid, role, f"{question}\n{answer}")
+
+    def _posting(self, term, n):
+        """(documents, term counts, idf) for one term"""
+        docs, counts = self.postings[term]
+        return docs, counts, math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+
+    def search(self, query, k=20, roles=None):
+        """[(question_id, score), ...] best first; `roles` limits the results"""
+        terms = set(search_terms(query))
+        with self.lock:
+            n = len(self.doc_ids)
+            terms = [t for t in terms if t in self.postings]
+            if not n or not terms:
+                return []
+            avgdl = self.total_length / n
+            allowed = None if roles is None else {self.roles.index(r) for r in roles if r in self.indexed}
+            try:
+                import numpy as np
+            except ImportError:
+                return self._search_python(terms, k, allowed, n, avgdl)
+
+            scores = np.zeros(n)
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+            for term in terms:
+                docs, counts, idf = self._posting(term, n)
+                docs = np.frombuffer(docs, dtype=np.uint32)
+                tf = np.frombuffer(counts, dtype=np.uint32).astype(np.float64)
+                scores[docs] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[docs] / avgdl))
+            if allowed is not None:
+                doc_roles = np.frombuffer(self.doc_roles, dtype=np.uint16)
+                scores[~np.isin(doc_roles, list(allowed))] = 0
+            hits = np.flatnonzero(scores)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            # Best first, ties in bank order
+            hits = hits[np.lexsort((hits, -scores[hits]))]
+            return [(self.doc_ids[doc], float(scores[doc])) for doc in hits.tolist()]
+
+    def _search_python(self, terms, k, allowed, n, avgdl):
+        scores = {}
+        for term in terms:
+            docs, counts, idf = self._posting(term, n)
+            for doc, tf in zip(docs, counts):
+                norm = K1 * (1 - B + B * self.doc_lengths[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        if allowed is not None:
+            scores = {doc: s for doc, s in scores.items() if self.doc_roles[doc] in allowed}
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.doc_ids[doc], score) for doc, score in best]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_search_index(bank=None):
+    """Process-wide index of the question bank, built on first use and
+    brought up to date with questions added since on every call"""
+    global _search_index
+    bank = bank or get_question_bank()
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex()
+        _search_index.sync(bank)
+        return _search_index
+
+@memoize_static
+def search_questions(query, k=20, roles=None):
+    """Top BM25 matches as compiled question entries, best first"""
+    bank = get_question_bank()
+    return [bank.entry(qid) for qid, _ in get_search_index(bank).search(query, k, roles)]
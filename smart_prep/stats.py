@@ -0,0 +1,96 @@
+"""Running per-role score aggregates kept on every user record."""
+import math
+from datetime import date, timedelta
+
+# Daily buckets older than this (relative to the role's newest day) are
+# dropped; weekly buckets are kept for the whole history
+DAILY_RETENTION_DAYS = 90
+
+def new_role_stats():
+    """Empty running aggregates for one role"""
+    return {'count': 0, 'correct': 0, 'sum': 0.0, 'sum_sq': 0.0, 'min': None, 'max': None, 'best': {}}
+
+def add_to_role_stats(role_stats, question, score):
+    """Fold one attempt into a role's running aggregates in O(1)"""
+    role_stats['count'] += 1
+    if score >= 70:  # Consider 70+ as correct
+        role_stats['correct'] += 1
+    role_stats['sum'] += score
+    role_stats['sum_sq'] += score * score
+    role_stats['min'] = score if role_stats['min'] is None else min(role_stats['min'], score)
+    role_stats['max'] = score if role_stats['max'] is None else max(role_stats['max'], score)
+    if score > role_stats['best'].get(question, -1):
+        role_stats['best'][question] = score
+
+def rebuild_role_stats(scores):
+    """Recompute every role's aggregates from the raw attempt history"""
+    all_stats = {}
+    for role, attempts in scores.items():
+        role_stats = all_stats[role] = new_role_stats()
+        for item in attempts:
+            add_to_role_stats(role_stats, item['question'], item['score'])
+    return all_stats
+
+def role_stats_outdated(all_stats):
+    """True for aggregates written before per-role correct counts were kept"""
+    return any('correct' not in role_stats for role_stats in all_stats.values())
+
+def check_role_stats(user_data, repair=False):
+    """Return roles whose stored aggregates disagree with the raw history"""
+    expected = rebuild_role_stats(user_data.get('scores', {}))
+    stored = user_data.get('role_stats', {})
+    mismatched = []
+    for role in set(expected) | set(stored):
+        want, have = expected.get(role), stored.get(role)
+        if want is None or have is None:
+            mismatched.append(role)
+            continue
+        # History keeps float32 scores while aggregates are folded from the
+        # submitted value, so compare at float32 precision
+        counts_ok = want['count'] == have['count'] and want['correct'] == have.get('correct')
+        numeric_ok = counts_ok and all(
+            want[k] == have[k] if want[k] is None or have[k] is None
+            else math.isclose(want[k], have[k], rel_tol=1e-6, abs_tol=1e-4)
+            for k in ('sum', 'sum_sq', 'min', 'max'))
+        best_ok = want['best'].keys() == have['best'].keys() and all(
+            math.isclose(score, have['best'][question], rel_tol=1e-6, abs_tol=1e-4)
+            for question, score in want['best'].items())
+        if not numeric_ok or not best_ok:
+            mismatched.append(role)
+    if repair and mismatched:
+        user_data['role_stats'] = expected
+    return sorted(mismatched)
+
+def new_rollups():
+    """Empty time-bucketed rollups for one role: {bucket start: [count, sum, max]}"""
+    return {'day': {}, 'week': {}}
+
+def _add_to_bucket(buckets, key, score):
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = [1, score, score]
+        return True
+    bucket[0] += 1
+    bucket[1] += score
+    bucket[2] = max(bucket[2], score)
+    return False
+
+def add_to_rollups(rollups, timestamp, score):
+    """Fold one attempt into a role's daily and weekly buckets"""
+    day = date.fromisoformat(timestamp[:10])
+    week = day - timedelta(days=day.weekday())  # Monday of that week
+    _add_to_bucket(rollups['week'], week.isoformat(), score)
+    if _add_to_bucket(rollups['day'], day.isoformat(), score):
+        newest = date.fromisoformat(max(rollups['day']))
+        cutoff = (newest - timedelta(days=DAILY_RETENTION_DAYS)).isoformat()
+        for key in [key for key in rollups['day'] if key < cutoff]:
+            del rollups['day'][key]
+
+def rebuild_rollups(scores):
+    """Recompute every role's rollups from the raw attempt history"""
+    all_rollups = {}
+    for role, attempts in scores.items():
+        rollups = all_rollups[role] = new_rollups()
+        for item in attempts:
+            add_to_rollups(rollups, item['timestamp'], item['score'])
+    return all_rollups
@@ -0,0 +1,86 @@
+"""TF-IDF scoring: words that are rare across the bank's model answers count for more.
+
+Selected per deployment with INTERVIEW_PREP_SCORING=tfidf; the default
+("standard") is score_question's keyword / length / overlap mix.
+
+IDF weights are computed once per process over every model answer in the
+bank. Each model answer becomes a sparse vector {term: tf * idf}
+normalized to sum to 1, so the score is one sparse dot product with the
+answer's set of words: the share of the model answer's TF-IDF weight the
+answer covers.
+"""
+import functools
+import math
+import os
+import threading
+from collections import Counter
+
+from .bank import ENTRY_CACHE_SIZE, get_question_bank
+from .scoring import STOPWORDS, WORD_RE, score_question
+
+SCORING_MODES = ('standard', 'tfidf')
+SCORING_MODE = os.environ.get("INTERVIEW_PREP_SCORING", "standard")
+
+class TfidfModel:
+    """IDF table for a bank plus cached TF-IDF vectors of its model answers"""
+
+    def __init__(self, idf, n_documents):
+        self.idf = idf
+        self.n_documents = n_documents
+        # Keyed by the entry's answer_lower, whose hash Python caches on the string
+        self.vector = functools.lru_cache(maxsize=ENTRY_CACHE_SIZE)(self._vector)
+
+    @classmethod
+    def from_bank(cls, bank):
+        df, n = Counter(), 0
+        for role in bank.roles:
+            for qid in bank.role_ids(role):
+                _, _, answer = bank.record(qid)
+                df.update(set(WORD_RE.findall(answer.lower())))
+                n += 1
+        # Smoothed, so a term in every answer still weighs 1
+        return cls({term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}, n)
+
+    def _vector(self, answer_lower):
+        counts = Counter(t for t in WORD_RE.findall(answer_lower) if t not in STOPWORDS)
+        default = math.log(1 + self.n_documents) + 1  # answer not in the corpus yet
+        weights = {t: tf * self.idf.get(t, default) for t, tf in counts.items()}
+        total = sum(weights.values())
+        return {t: w / total for t, w in weights.items()} if total else {}
+
+    def score(self, user_answer, entry, analysis=None):
+        """0-100: TF-IDF weight of the model answer covered by the user's words"""
+        weights = self.vector(entry['answer_lower'])
+        words = analysis['words'] if analysis is not None else set(WORD_RE.findall(user_answer.lower()))
+        covered = sum(weights.get(t, 0.0) for t in words)
+        return min(covered * 100, 100)
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_tfidf_model():
+    """Model over the configured bank, built on first use"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = TfidfModel.from_bank(get_question_bank())
+        return _model
+
+def score_tfidf(user_answer, entry, analysis=None):
+    return get_tfidf_model().score(user_answer, entry, analysis)
+
+def check_scoring_mode(mode=None):
+    """`mode`, or the deployment's INTERVIEW_PREP_SCORING, checked against
+    SCORING_MODES; the app and the CLIs call it at startup"""
+    mode = mode or SCORING_MODE
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode {mode!r} (INTERVIEW_PREP_SCORING): "
+                         f"use one of {', '.join(SCORING_MODES)}")
+    return mode
+
+def score_answer(user_answer, entry, mode=None, analysis=None):
+    """Score with the deployment's scoring mode (INTERVIEW_PREP_SCORING);
+    pass analyze_answer's result to reuse it"""
+    if check_scoring_mode(mode) == 'tfidf':
+        return score_tfidf(user_answer, entry, analysis)
+    return score_question(user_answer, entry, analysis)
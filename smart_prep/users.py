@@ -0,0 +1,117 @@
+"""Account and progress operations used by the app."""
+from datetime import datetime
+
+from .cache import bump_user_version, memoize_user
+from .leaderboard import current_leaderboards
+from .metrics import timed
+from .passwords import check_password, hash_password, run_kdf
+from .progress import progress_chart_data
+from .scheduler import next_question
+from .stats import rebuild_role_stats, rebuild_rollups
+from .storage import get_default_storage
+
+def new_user_record(password_hash, email="", created_at=None):
+    """Record for a new account with no attempts yet"""
+    return {
+        'password': password_hash,
+        'email': email,
+        'created_at': created_at or datetime.now().isoformat(),
+        'scores': {},
+        'role_stats': {},
+        'rollups': {},
+        'schedule': {},
+        'total_questions': 0,
+        'correct_answers': 0
+    }
+
+@timed("save_user_data")
+def save_user_data(username, password, email=""):
+    """Save user data - now with persistent storage; False if the username is taken"""
+    created = get_default_storage().add_user(username, new_user_record(run_kdf(hash_password, password), email))
+    bump_user_version(username)
+    return created
+
+@timed("verify_user")
+def verify_user(username, password):
+    """Verify user credentials - now with persistent storage"""
+    storage = get_default_storage()
+    stored_hash = storage.get_password_hash(username)
+    if stored_hash is None:
+        return False
+    matches, needs_upgrade = run_kdf(check_password, password, stored_hash)
+    # Transparently move legacy/weak hashes to the current KDF parameters
+    if matches and needs_upgrade:
+        storage.set_password_hash(username, run_kdf(hash_password, password))
+    return matches
+
+@timed("update_user_score")
+def update_user_score(username, role, question, score, answer=None):
+    """Update user's score - now with persistent storage"""
+    storage = get_default_storage()
+    attempt = {
+        'question': question,
+        'score': score,
+        'timestamp': datetime.now().isoformat()
+    }
+    # Keep the answer text (deduplicated, compressed) so it can be re-scored later
+    if answer is not None:
+        attempt['answer_hash'] = storage.put_answer(answer)
+    storage.add_attempt(username, role, attempt)
+    bump_user_version(username)
+    leaderboards = current_leaderboards()
+    if leaderboards is not None:  # otherwise they're built from storage on first view
+        leaderboards.update_user(username, storage.get_user(username, recent=0), role)
+
+@timed("next_practice_question")
+def next_practice_question(username, role):
+    """(question_id, reason) to practice next, from the user's SM-2 schedule,
+    or None if the role has no questions"""
+    user_data = get_default_storage().get_user(username, recent=0)
+    schedule = user_data.get('schedule', {}).get(role) if user_data else None
+    return next_question(schedule, role)
+
+@timed("get_user_stats")
+@memoize_user
+def get_user_stats(username):
+    """Get user statistics - now with persistent storage
+
+    Memoized until the user's next write; treat the result as read-only.
+    """
+    user_data = get_default_storage().get_user(username, recent=10)
+    if user_data is None:
+        return None
+    
+    total_questions = user_data.get('total_questions', 0)
+    correct_answers = user_data.get('correct_answers', 0)
+    accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
+    
+    # Average score per role from the running aggregates
+    role_stats = user_data.get('role_stats')
+    if role_stats is None:
+        role_stats = rebuild_role_stats(user_data.get('scores', {}))
+    rollups = user_data.get('rollups')
+    if rollups is None:
+        rollups = rebuild_rollups(user_data.get('scores', {}))
+    role_averages = {
+        role: agg['sum'] / agg['count']
+        for role, agg in role_stats.items() if agg['count']
+    }
+    
+    return {
+        'total_questions': total_questions,
+        'correct_answers': correct_answers,
+        'accuracy': accuracy,
+        'role_averages': role_averages,
+        'role_stats': role_stats,
+        'rollups': rollups,
+        'recent_scores': user_data.get('scores', {})
+    }
+
+@timed("get_progress_chart")
+@memoize_user
+def get_progress_chart(username):
+    """Progress chart table for a user (see progress_chart_data), or None without attempts"""
+    stats = get_user_stats(username)
+    if not stats or not stats['rollups']:
+        return None
+    return progress_chart_data(stats['rollups'])
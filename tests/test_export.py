@@ -0,0 +1,37 @@
+"""Streaming export of the JSON backend's files."""
+import pytest
+
+from smart_prep.export import iter_accounts, iter_attempts
+from smart_prep.migrate import SnapshotSource
+from smart_prep.storage import JsonStorage, compact_users_file, flush_pending_writes
+from smart_prep.users import new_user_record
+
+ROLE = "Data Scientist"
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def attempt(n, score=50.0):
+    return {'question': f"Custom question {n}?", 'score': score, 'timestamp': f"2024-01-{n + 1:02d}T10:00:00"}
+
+def test_snapshot_source_matches_json_storage():
+    store = JsonStorage()
+    for username in ("ada", "bob"):
+        store.add_user(username, new_user_record("x", created_at="2024-01-01T00:00:00"))
+        store.add_attempts(username, ROLE, [attempt(n) for n in range(3)])
+    flush_pending_writes()
+    compact_users_file()
+    # Left in the log: a new answer, a re-score, a password change and a new user
+    store.add_attempt("ada", ROLE, attempt(3, 90.0))
+    store.set_scores("bob", {ROLE: [10.0, 20.0]})
+    store.set_password_hash("bob", "y")
+    store.add_user("cyd", new_user_record("z", created_at="2024-02-01T00:00:00"))
+    store.add_attempt("cyd", ROLE, attempt(4))
+    flush_pending_writes()
+
+    source = SnapshotSource()
+    assert list(iter_attempts(source)) == list(iter_attempts(store))
+    assert list(iter_accounts(source)) == list(iter_accounts(store))
+    assert [row['score'] for row in iter_attempts(source, usernames=["bob"])] == [10.0, 20.0, 50.0]
@@ -0,0 +1,48 @@
+"""Packed attempt histories across question bank changes."""
+import pytest
+
+from smart_prep import history
+from smart_prep.bank import MemoryQuestionBank
+from smart_prep.history import MISSING_QUESTION, RoleHistory, decode_scores, encode_scores
+from smart_prep.questions import question_id, questions_answers, role_descriptions
+
+ROLE = next(iter(questions_answers))
+BUILT_IN = [question for question, _ in questions_answers[ROLE][:3]]
+
+@pytest.fixture
+def swap_bank(monkeypatch):
+    """Make history resolve question IDs against another bank from now on"""
+    def swap(bank):
+        monkeypatch.setattr(history, "get_question_bank", lambda: bank)
+        history._bank_question.cache_clear()
+    yield swap
+    history._bank_question.cache_clear()
+
+def attempts(questions):
+    return [{'question': question, 'score': 50.0 + i, 'timestamp': f"2024-01-0{i + 1}T10:00:00"}
+            for i, question in enumerate(questions)]
+
+def other_bank():
+    return MemoryQuestionBank({ROLE: [("What is a different question?", "A different answer.")]},
+                              role_descriptions)
+
+def test_decodes_with_another_bank(swap_bank):
+    items = attempts(BUILT_IN + ["A question that was never in the bank?"])
+    data = encode_scores({ROLE: items})
+
+    swap_bank(other_bank())
+    decoded = decode_scores(data)[ROLE]
+    assert list(decoded) == items
+
+def test_history_written_before_texts_were_kept(swap_bank):
+    items = attempts(BUILT_IN)
+    old = RoleHistory(ROLE, items)
+    old.names = {}  # all three were in the bank, so no text was stored
+    data = encode_scores({ROLE: old})
+
+    assert list(decode_scores(data)[ROLE]) == items  # built-in bank still has them
+    swap_bank(other_bank())
+    decoded = list(decode_scores(data)[ROLE])
+    assert [item['question'] for item in decoded] == [
+        MISSING_QUESTION.format(int(question_id(ROLE, question), 16)) for question in BUILT_IN]
+    assert [item['score'] for item in decoded] == [item['score'] for item in items]
@@ -0,0 +1,49 @@
+"""Metrics exporters must never break the page."""
+import socket
+import time
+
+import pytest
+
+from smart_prep import metrics
+
+@pytest.fixture
+def exporters(monkeypatch):
+    monkeypatch.setattr(metrics, "_exporters_started", False)
+    monkeypatch.setattr(metrics, "_server", None)
+    return monkeypatch
+
+def test_port_in_use_is_logged_not_raised(exporters, capsys):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        exporters.setenv("INTERVIEW_PREP_METRICS_PORT", str(taken.getsockname()[1]))
+        metrics.start_metrics_exporters()
+        metrics.start_metrics_exporters()  # not retried
+    assert capsys.readouterr().err.count("not serving on port") == 1
+    assert metrics._server is None
+
+def test_bad_port_is_logged_not_raised(exporters, capsys):
+    exporters.setenv("INTERVIEW_PREP_METRICS_PORT", "metrics")
+    metrics.start_metrics_exporters()
+    assert "not serving on port 'metrics'" in capsys.readouterr().err
+
+def test_unwritable_file_is_logged_not_raised(exporters, tmp_path, capsys):
+    exporters.delenv("INTERVIEW_PREP_METRICS_PORT", raising=False)
+    exporters.setenv("INTERVIEW_PREP_METRICS_FILE", str(tmp_path / "missing" / "metrics.prom"))
+    metrics.start_metrics_exporters()
+    deadline = time.monotonic() + 5
+    while "can't write" not in capsys.readouterr().err:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_file_is_written_in_the_background(exporters, tmp_path):
+    path = tmp_path / "metrics.prom"
+    exporters.delenv("INTERVIEW_PREP_METRICS_PORT", raising=False)
+    exporters.setenv("INTERVIEW_PREP_METRICS_FILE", str(path))
+    metrics.observe("test_stage", 0.01)
+    metrics.start_metrics_exporters()
+    deadline = time.monotonic() + 5
+    while not path.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert 'stage="test_stage"' in path.read_text()
@@ -0,0 +1,49 @@
+"""migrate_users.py into the sharded backend."""
+import json
+
+import pytest
+
+import migrate_users
+from smart_prep.storage import ShardedStorage
+from smart_prep.users import new_user_record
+
+def legacy_user(n):
+    record = new_user_record("x", created_at="2024-01-01T00:00:00")
+    record['scores'] = {"Data Scientist": [
+        {'question': f"Custom question {i}?", 'score': 60.0 + i, 'timestamp': f"2024-01-0{i + 1}T10:00:00"}
+        for i in range(n)]}
+    record['total_questions'] = n
+    return record
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # The app's own snapshot, which has nothing to do with this migration
+    (tmp_path / "users_data.json").write_text(json.dumps({f"local{i}": legacy_user(1) for i in range(5)}))
+    (tmp_path / "legacy.json").write_text(json.dumps({f"legacy{i}": legacy_user(3) for i in range(4)}))
+    return tmp_path
+
+def test_only_the_source_is_migrated(data_dir):
+    assert migrate_users.main(["--to", "sharded", "--source", "legacy.json"]) == 0
+    target = ShardedStorage(migrate=False)
+    assert target.iter_usernames() == [f"legacy{i}" for i in range(4)]
+    assert "legacy.json" in (data_dir / "users" / "MIGRATED").read_text()
+    # A later start of the app doesn't import users_data.json on top
+    assert ShardedStorage().iter_usernames() == [f"legacy{i}" for i in range(4)]
+
+def test_verification_fails_on_users_missing_from_the_source(data_dir, capsys):
+    assert migrate_users.main(["--to", "sharded", "--source", "legacy.json"]) == 0
+    ShardedStorage(migrate=False).add_user("intruder", new_user_record("x"))
+    assert migrate_users.main(["--to", "sharded", "--source", "legacy.json", "--verify-only"]) == 1
+    assert "intruder: unexpected" in capsys.readouterr().err
+
+def test_verification_compares_the_source_counters(data_dir, capsys):
+    records = json.loads((data_dir / "legacy.json").read_text())
+    records["legacy0"]['total_questions'] = 5  # disagrees with its 3 attempts
+    records["legacy1"]['correct_answers'] = 1  # none of its scores is 70+
+    (data_dir / "legacy.json").write_text(json.dumps(records))
+    assert migrate_users.main(["--to", "sharded", "--source", "legacy.json"]) == 1
+    err = capsys.readouterr().err
+    assert "legacy0: total_questions (stored)" in err
+    assert "legacy1: correct_answers (stored)" in err
+    assert "legacy2" not in err
@@ -0,0 +1,60 @@
+"""Picking the next practice question from an SM-2 schedule."""
+import copy
+
+import pytest
+
+from smart_prep import scheduler
+from smart_prep.bank import MemoryQuestionBank
+from smart_prep.history import to_epoch
+from smart_prep.questions import question_id
+from smart_prep.scheduler import DAY, new_schedule, next_question, update_schedule
+
+ROLE = "Data Scientist"
+QUESTIONS = [(f"Question {n}?", f"Answer {n}.") for n in range(3)]
+IDS = [question_id(ROLE, question) for question, _ in QUESTIONS]
+NOW = to_epoch("2024-01-01T10:00:00")
+
+@pytest.fixture
+def use_bank(monkeypatch):
+    def use(bank):
+        monkeypatch.setattr(scheduler, "get_question_bank", lambda: MemoryQuestionBank(bank, {}))
+    use({ROLE: QUESTIONS})
+    return use
+
+def answered(*scores):
+    """Schedule after answering question n on day n, for the first len(scores)
+    questions; each comes due a day later"""
+    schedule = new_schedule()
+    for n, ((question, _), score) in enumerate(zip(QUESTIONS, scores)):
+        update_schedule(schedule, ROLE, question, score, f"2024-01-0{n + 1}T10:00:00")
+    return schedule
+
+def test_overdue_review_then_new_then_ahead(use_bank):
+    schedule = answered(40, 95)
+    assert next_question(schedule, ROLE, now=NOW + 1.5 * DAY) == (IDS[0], 'review')
+    assert next_question(schedule, ROLE, now=NOW) == (IDS[2], 'new')
+    schedule = answered(40, 95, 95)
+    assert next_question(schedule, ROLE, now=NOW) == (IDS[0], 'ahead')
+
+def test_rescheduled_card_is_not_picked_from_its_old_entry(use_bank):
+    schedule = answered(40, 95, 95)
+    update_schedule(schedule, ROLE, QUESTIONS[0][0], 40, "2024-01-03T22:00:00")  # was due on day 1
+    assert next_question(schedule, ROLE, now=NOW + 1.5 * DAY) == (IDS[1], 'ahead')
+    assert next_question(schedule, ROLE, now=NOW + 3.5 * DAY) == (IDS[1], 'review')
+
+def test_cards_that_left_the_bank_are_skipped(use_bank):
+    schedule = answered(40, 60, 95)
+    before = copy.deepcopy(schedule)
+    use_bank({ROLE: QUESTIONS[1:]})  # question 0, the most overdue card, was removed
+    assert next_question(schedule, ROLE, now=NOW + 1.5 * DAY) == (IDS[1], 'ahead')
+    assert next_question(schedule, ROLE, now=NOW + 2.5 * DAY) == (IDS[1], 'review')
+    assert schedule == before
+
+def test_only_cards_that_left_the_bank(use_bank):
+    schedule = answered(40)
+    use_bank({ROLE: [], "Other": QUESTIONS})
+    assert next_question(schedule, ROLE, now=NOW + 2 * DAY) is None
+
+def test_role_without_questions(use_bank):
+    use_bank({ROLE: []})
+    assert next_question(None, ROLE, now=NOW) is None
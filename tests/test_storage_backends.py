@@ -0,0 +1,23 @@
+"""Behaviour every storage backend has to share."""
+import pytest
+
+from smart_prep.storage import JsonStorage, ShardedStorage, SqliteStorage
+from smart_prep.users import new_user_record
+
+BACKENDS = {'json': JsonStorage, 'sqlite': SqliteStorage, 'sharded': ShardedStorage}
+
+@pytest.fixture(params=sorted(BACKENDS))
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return BACKENDS[request.param]()
+
+def test_duplicate_username_is_refused(storage):
+    assert storage.add_user("ada", new_user_record("first")) is True
+    storage.add_attempt("ada", "Data Scientist",
+                        {'question': "Custom question?", 'score': 90.0, 'timestamp': "2024-01-01T00:00:00"})
+
+    assert storage.add_user("ada", new_user_record("second")) is False
+    user_data = storage.get_user("ada")
+    assert user_data['password'] == "first"
+    assert user_data['total_questions'] == 1
+    assert user_data['role_stats']["Data Scientist"]['count'] == 1
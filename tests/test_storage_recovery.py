@@ -0,0 +1,207 @@
+"""Crash recovery of the JSON snapshot + event log."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from smart_prep import storage
+from smart_prep.storage import (COMPACTING_FILE, EVENTS_FILE, USERS_FILE, EventLogWriter, JsonStorage,
+                                _replay_events, _write_snapshot, append_event, compact_users_file,
+                                flush_pending_writes, load_users_from_file, next_event_seq)
+from smart_prep.users import new_user_record
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def signup(username):
+    return {'seq': next_event_seq(), 'op': 'signup', 'user': username,
+            'record': new_user_record("x", created_at="2024-01-01T00:00:00")}
+
+def score(username, n):
+    return {'seq': next_event_seq(), 'op': 'score', 'user': username, 'role': "Data Scientist",
+            'attempt': {'question': f"Custom question {n}?", 'score': 80.0,
+                        'timestamp': f"2024-01-01T00:{n // 60:02d}:{n % 60:02d}"}}
+
+def write_log(path, events, tail=b""):
+    with open(path, "wb") as f:
+        for event in events:
+            f.write(json.dumps(event).encode() + b"\n")
+        f.write(tail)
+
+def totals(users_db):
+    return {username: user_data['total_questions'] for username, user_data in users_db.items()}
+
+def test_torn_last_line_is_skipped_and_fenced_off():
+    write_log(EVENTS_FILE, [signup("ada"), score("ada", 1)], tail=b'{"seq": 1, "op": "sco')
+    assert totals(load_users_from_file()) == {"ada": 1}
+
+    append_event(score("ada", 2))
+    assert totals(load_users_from_file()) == {"ada": 2}
+    with open(EVENTS_FILE, "rb") as f:
+        assert f.read().count(b"\n") == 4  # the torn line got its own line
+
+def test_corrupt_line_in_the_middle_is_skipped():
+    write_log(EVENTS_FILE, [signup("ada"), score("ada", 1)], tail=b"not json\n")
+    with open(EVENTS_FILE, "ab") as f:
+        f.write(json.dumps(score("ada", 2)).encode() + b"\n")
+    assert totals(load_users_from_file()) == {"ada": 2}
+
+def test_replaying_folded_events_is_a_noop():
+    events = [signup("ada")] + [score("ada", n) for n in range(5)]
+    write_log(EVENTS_FILE, events)
+    users_db = load_users_from_file()
+    _write_snapshot(users_db)  # snapshot written, log not yet removed
+
+    again = load_users_from_file()
+    assert totals(again) == {"ada": 5}
+    assert again["ada"]['log_seq'] == events[-1]['seq']
+    _replay_events(again, EVENTS_FILE)
+    assert totals(again) == {"ada": 5}
+    assert again["ada"]['correct_answers'] == 5
+
+def test_compaction_interrupted_after_rotation():
+    write_log(COMPACTING_FILE, [signup("ada"), score("ada", 1)])
+    write_log(EVENTS_FILE, [score("ada", 2), signup("bob")])
+    assert totals(load_users_from_file()) == {"ada": 2, "bob": 0}
+
+    compact_users_file()  # finishes the rotated log, leaves the live one alone
+    assert not os.path.exists(COMPACTING_FILE)
+    assert os.path.exists(EVENTS_FILE)
+    assert totals(load_users_from_file()) == {"ada": 2, "bob": 0}
+
+def test_compaction_interrupted_after_snapshot_write():
+    events = [signup("ada"), score("ada", 1), score("ada", 2)]
+    write_log(COMPACTING_FILE, events)
+    users_db = {}
+    _replay_events(users_db, COMPACTING_FILE)
+    _write_snapshot(users_db)  # crashed before removing the rotated log
+    write_log(EVENTS_FILE, [score("ada", 3)])
+    assert totals(load_users_from_file()) == {"ada": 3}
+
+    compact_users_file()
+    compact_users_file()
+    assert not os.path.exists(COMPACTING_FILE) and not os.path.exists(EVENTS_FILE)
+    assert totals(load_users_from_file()) == {"ada": 3}
+
+def test_leftover_snapshot_temp_file_is_ignored():
+    write_log(EVENTS_FILE, [signup("ada"), score("ada", 1)])
+    compact_users_file()
+    with open(USERS_FILE + ".abc.tmp", "w") as f:
+        f.write('{"ada": {"trunc')
+    assert totals(load_users_from_file()) == {"ada": 1}
+
+WRITER = """
+import sys
+sys.path.insert(0, {root!r})
+from smart_prep.storage import append_event, next_event_seq
+from smart_prep.users import new_user_record
+
+username, count = sys.argv[1], int(sys.argv[2])
+append_event({{'seq': next_event_seq(), 'op': 'signup', 'user': username,
+               'record': new_user_record("x", created_at="2024-01-01T00:00:00")}})
+for n in range(count):
+    append_event({{'seq': next_event_seq(), 'op': 'score', 'user': username, 'role': "Data Scientist",
+                   'attempt': {{'question': "Custom question?", 'score': 50.0,
+                               'timestamp': "2024-01-01T00:00:00"}}}})
+"""
+
+def test_appends_from_other_processes_survive_compaction(data_dir):
+    script = data_dir / "writer.py"
+    script.write_text(WRITER.format(root=ROOT))
+    writers = [subprocess.Popen([sys.executable, str(script), f"proc{i}", "300"]) for i in range(3)]
+    while any(w.poll() is None for w in writers):
+        compact_users_file()
+    assert all(w.returncode == 0 for w in writers)
+    compact_users_file()
+    assert totals(load_users_from_file()) == {f"proc{i}": 300 for i in range(3)}
+
+def test_compaction_skips_while_another_process_holds_the_lock():
+    write_log(EVENTS_FILE, [signup("ada")])
+    other = storage.FileLock(storage.COMPACT_LOCK_FILE)
+    holder = subprocess.Popen(
+        [sys.executable, "-c", "import fcntl, sys, time; f = open(sys.argv[1], 'a'); "
+         "fcntl.flock(f, fcntl.LOCK_EX); print('locked', flush=True); time.sleep(30)",
+         storage.COMPACT_LOCK_FILE], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        assert other.acquire(blocking=False) is False
+        compact_users_file()
+        assert os.path.exists(EVENTS_FILE) and not os.path.exists(USERS_FILE)
+    finally:
+        holder.kill()
+        holder.wait()
+    compact_users_file()
+    assert totals(load_users_from_file()) == {"ada": 0}
+
+def attempt(n):
+    return {'question': f"Custom question {n}?", 'score': 80.0, 'timestamp': "2024-01-01T00:00:00"}
+
+def run_writer(data_dir, username, count):
+    script = data_dir / "writer.py"
+    script.write_text(WRITER.format(root=ROOT))
+    subprocess.run([sys.executable, str(script), username, str(count)], check=True)
+
+def test_own_compaction_does_not_reload():
+    store = JsonStorage()
+    store.add_user("ada", new_user_record("x"))
+    for n in range(3):
+        store.add_attempt("ada", "Data Scientist", attempt(n))
+    flush_pending_writes()
+    state = store.state
+    compact_users_file()
+    store.add_attempt("ada", "Data Scientist", attempt(3))
+    assert store.get_user("ada")['total_questions'] == 4
+    assert store.state is state and not store.reloading
+
+def test_events_from_other_processes_in_a_rotated_log_are_read(data_dir):
+    store = JsonStorage()
+    store.add_user("ada", new_user_record("x"))
+    flush_pending_writes()
+    assert store.get_user("ada") is not None
+    run_writer(data_dir, "bob", 5)  # lands in the log this process is reading
+    compact_users_file()            # which is folded into our own snapshot
+    assert store.get_user("bob")['total_questions'] == 5
+    assert not store.reloading
+
+def test_snapshot_replaced_by_another_process_reloads_in_background(data_dir):
+    store = JsonStorage()
+    store.add_user("ada", new_user_record("x"))
+    flush_pending_writes()
+    run_writer(data_dir, "bob", 5)
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); "
+                    "from smart_prep.storage import compact_users_file; compact_users_file()"], check=True)
+    run_writer(data_dir, "cyd", 2)  # written to a log this process never opened
+
+    store.get_user("ada")  # notices the new snapshot, keeps serving the old state
+    deadline = time.monotonic() + 10
+    while store.reloading or store.get_user("cyd") is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert store.get_user("bob")['total_questions'] == 5
+    assert store.get_user("cyd")['total_questions'] == 2
+    assert store.get_user("ada") is not None
+
+def test_queued_answer_written_after_another_process_answer_is_kept(data_dir):
+    store = JsonStorage()
+    store.add_user("ada", new_user_record("x"))
+    store.writer = EventLogWriter(flush_interval=30)  # holds the answer until flush()
+    try:
+        store.add_attempt("ada", "Data Scientist", attempt(1))  # queued, applied in memory
+        run_writer(data_dir, "ada", 1)  # a CLI answers for the same user meanwhile
+        store.writer.flush()            # our answer lands after the CLI's
+    finally:
+        store.writer.close()
+    assert totals(load_users_from_file()) == {"ada": 2}
+    assert store.get_user("ada")['total_questions'] == 2
+
+    compact_users_file()
+    assert totals(load_users_from_file()) == {"ada": 2}
+    assert store.get_user("ada")['total_questions'] == 2
+    assert not store.state.applied
@@ -0,0 +1,18 @@
+"""Choosing the scoring mode."""
+import pytest
+
+from smart_prep import tfidf
+from smart_prep.batch import score_batch
+from smart_prep.tfidf import SCORING_MODES, check_scoring_mode
+
+def test_configured_mode_is_checked(monkeypatch):
+    monkeypatch.setattr(tfidf, "SCORING_MODE", "tfdif")
+    with pytest.raises(ValueError, match="tfdif"):
+        check_scoring_mode()
+    with pytest.raises(ValueError, match="tfdif"):
+        score_batch([], [])
+    assert check_scoring_mode("tfidf") == "tfidf"
+
+def test_known_modes_pass():
+    for mode in SCORING_MODES:
+        assert check_scoring_mode(mode) == mode